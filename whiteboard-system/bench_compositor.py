@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark the PIL and NumPy compositing backends.
+Renders synthetic storyboards with 1, 10 and 100 image sprites offline
+(stickers are drawn locally, no API calls) and reports per-frame cost, full
+redraw and dirty-rectangle (FrameCompositor over consecutive frames), plus the
+largest pixel difference between the two backends, separately for settled
+frames and for frames where sprites are mid-fade. Both should be 0.
+
+Usage: python bench_compositor.py [frames_per_case]
+"""
+
+import os
+import sys
+import time
+import random
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")  # clients are created at import, never called
+
+import numpy as np
+from PIL import Image, ImageDraw
+import renderer
+import compositor
+from model import Storyboard
+
+def synthetic_clipart(prompt: str, size: str = "1024x1024") -> Image.Image:
+    """Deterministic transparent sticker with an outline and a translucent fill."""
+    rng = random.Random(prompt)
+    img = Image.new("RGBA", (1024, 1024), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((100, 100, 900, 900), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 255),
+                 outline=(0, 0, 0, 255), width=30)
+    draw.rectangle((300, 400, 700, 600), fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), 128))
+    return img
+
+def synthetic_storyboard(n_sprites: int) -> dict:
+    rng = random.Random(n_sprites)
+    elements = []
+    for i in range(n_sprites):
+        elements.append({
+            "type": "image",
+            "content": f"sprite {i}",
+            "start": 0.0,
+            "end": 10.0,
+            "x": rng.uniform(0.1, 0.9),
+            "y": rng.uniform(0.0, 0.75),
+            "w": 0.17,
+            "h": 0.25,
+            "fx": rng.choice(["fade", "slide_up", "none"]),
+        })
+    return {"scene_duration": 10.0, "elements": elements}
+
+def time_frames(render, storyboard: dict, times: list) -> float:
+    start = time.perf_counter()
+    for t in times:
+        render(t, storyboard)
+    return (time.perf_counter() - start) / len(times)
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    renderer.gen_clipart = synthetic_clipart
+    compositor.gen_clipart = synthetic_clipart
+
+    print("Compositor Benchmark")
+    print("=" * 84)
+    print(f"{'sprites':>8} {'pil ms/frame':>14} {'numpy ms/frame':>16} {'dirty ms/frame':>15} {'speedup':>9} {'diff settled':>13} {'diff fading':>12}")
+
+    for n in (1, 10, 100):
+        sb = Storyboard.from_dict(synthetic_storyboard(n))
+        # Half the frames mid-fade (alpha < 1), half settled
+        times = [0.25 + 0.25 * i / frames for i in range(frames // 2)]
+        times += [5.0 + i / frames for i in range(frames - len(times))]
+
+        # Warm sprite and font caches so the numpy numbers are steady-state
+        compositor.composite_frame_np(times[0], sb)
+
+        pil_ms = time_frames(renderer.composite_frame, sb, times) * 1000
+        np_ms = time_frames(compositor.composite_frame_np, sb, times) * 1000
+
+        # Consecutive 30 FPS frames from the end of the fade-in into the hold
+        incremental = compositor.FrameCompositor(sb)
+        dirty_ms = time_frames(lambda t, _: incremental.render(t), sb, [0.4 + i / 30 for i in range(frames * 3)]) * 1000
+
+        diffs = []
+        for t in (times[-1], times[0]):
+            a = np.asarray(renderer.composite_frame(t, sb), dtype=np.int16)
+            b = compositor.composite_frame_np(t, sb).astype(np.int16)
+            diffs.append(int(np.abs(a - b).max()))
+
+        print(f"{n:>8} {pil_ms:>14.1f} {np_ms:>16.1f} {dirty_ms:>15.1f} {pil_ms / np_ms:>8.1f}x {diffs[0]:>13} {diffs[1]:>12}")
+
+    print("=" * 84)
+
+if __name__ == "__main__":
+    main()
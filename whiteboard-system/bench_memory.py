@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark and regression check for the render path.
+Runs render_video on synthetic storyboards of increasing element count and
+duration with offline stickers (drawn locally, no API calls), each
+in a fresh process under tracemalloc and a background RSS sampler, and
+reports per case:
+
+    peak traced   Python and NumPy memory allocated by the render at peak
+    peak RSS      the process's peak resident set, imports included (Linux
+                  only; the ffmpeg encoder is a separate process)
+    images        PIL image allocations (canvases, decodes, conversions)
+
+plus, per element count, what each extra frame costs between the shortest
+and longest duration: bytes of peak growth per frame (non-zero means frames
+are being kept) and PIL image allocations per frame.
+
+With --check the results are compared against a baseline file and the script
+exits 1 when any figure exceeds its baseline by more than the tolerance.
+
+Usage: python bench_memory.py [--backend numpy] [--check] [--update-baseline] [--tolerance 0.15]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")  # clients are created at import, never called
+# Stubbed renders must not calibrate the planner
+os.environ["RENDER_TIMINGS"] = os.devnull
+
+from PIL import Image
+import renderer
+import compositor
+import video
+from bench_compositor import synthetic_clipart, synthetic_storyboard
+from model import Storyboard
+
+BASELINE_FILE = Path(__file__).with_name("memory_baseline.json")
+
+ELEMENT_COUNTS = (1, 10, 40)
+DURATIONS = (2.0, 6.0)
+FPS = 30
+
+# Allowed growth over the baseline before a figure counts as a regression
+TOLERANCE = 0.15
+# Absolute slack so near-zero figures don't fail on noise
+BYTES_SLACK = 2 * 1024 * 1024
+ALLOCS_SLACK = 1.0
+
+# Seconds between RSS samples
+RSS_INTERVAL = 0.005
+
+def memory_storyboard(n_elements: int, seconds: float) -> Storyboard:
+    """
+    bench_compositor's sprite layout squeezed into seconds, staggered in over
+    the first half, plus a title so the text path is exercised too.
+    """
+    data = synthetic_storyboard(n_elements)
+    for i, el in enumerate(data["elements"]):
+        el["start"] = round(seconds / 2 * i / n_elements, 3)
+        el["end"] = seconds
+    data["elements"].insert(0, {
+        "type": "text", "content": "Memory benchmark", "start": 0.0, "end": seconds,
+        "x": 0.5, "y": 0.05, "w": 0.8, "h": 0.2, "fx": "none",
+    })
+    data["scene_duration"] = seconds
+    return Storyboard.from_dict(data)
+
+def measure_case(n_elements: int, seconds: float, backend: str, out_dir: str) -> dict:
+    """
+    Render one synthetic storyboard with cold caches and return its memory
+    figures. Meant to run in its own process (see run_benchmark) so earlier
+    cases' caches and allocator state don't leak into the numbers.
+    """
+    renderer.gen_clipart = synthetic_clipart
+    compositor.gen_clipart = synthetic_clipart
+    video.prefetch_stickers = lambda prompts, *args, **kwargs: {"miss": 0}
+    storyboard = memory_storyboard(n_elements, seconds)
+
+    images_before = Image.core.get_stats()["new_count"]
+    started = time.perf_counter()
+    tracemalloc.start()
+    try:
+        with video.RSSSampler(RSS_INTERVAL) as rss:
+            video.render_video(storyboard, os.path.join(out_dir, "bench.mp4"), fps=FPS, backend=backend,
+                               resume=False)
+        peak_traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "elements": n_elements,
+        "seconds": seconds,
+        "frames": int((seconds + 0.1) * FPS),
+        "peak_traced_bytes": peak_traced,
+        "peak_rss_bytes": rss.peak,
+        "images": Image.core.get_stats()["new_count"] - images_before,
+        "render_seconds": round(time.perf_counter() - started, 2),
+    }
+
+def per_frame(cases: list) -> dict:
+    """
+    Marginal cost of a frame per element count, from the shortest and longest
+    case: peak growth and PIL image allocations divided by the extra frames.
+    """
+    slopes = {}
+    for n in sorted({c["elements"] for c in cases}):
+        rows = sorted((c for c in cases if c["elements"] == n), key=lambda c: c["frames"])
+        short, long = rows[0], rows[-1]
+        extra = long["frames"] - short["frames"]
+        if extra <= 0:
+            continue
+        slopes[str(n)] = {
+            "bytes_per_frame": max(0, long["peak_traced_bytes"] - short["peak_traced_bytes"]) / extra,
+            "allocs_per_frame": (long["images"] - short["images"]) / extra,
+        }
+    return slopes
+
+def run_benchmark(backend: str = "numpy", element_counts=ELEMENT_COUNTS, durations=DURATIONS) -> dict:
+    """Measure every (element count, duration) case, each in a fresh process."""
+    cases = []
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as out_dir:
+        for n in element_counts:
+            for seconds in durations:
+                with context.Pool(1) as pool:
+                    cases.append(pool.apply(measure_case, (n, seconds, backend, out_dir)))
+    return {"backend": backend, "fps": FPS, "cases": cases, "per_frame": per_frame(cases)}
+
+def _exceeds(value: float, baseline: float, slack: float, tolerance: float) -> bool:
+    return value > baseline * (1 + tolerance) + slack
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list:
+    """
+    Regressions of results against a baseline run of the same backend, as
+    human-readable strings. Cases missing from the baseline are skipped.
+    """
+    regressions = []
+    base_cases = {(c["elements"], c["seconds"]): c for c in baseline.get("cases", [])}
+    for case in results["cases"]:
+        base = base_cases.get((case["elements"], case["seconds"]))
+        if base is None:
+            continue
+        for key in ("peak_traced_bytes", "peak_rss_bytes", "images"):
+            slack = ALLOCS_SLACK if key == "images" else BYTES_SLACK
+            # RSS is 0 where it can't be read; don't compare against that
+            if key == "peak_rss_bytes" and not (case[key] and base[key]):
+                continue
+            if _exceeds(case[key], base[key], slack, tolerance):
+                regressions.append(f"{case['elements']} elements, {case['seconds']}s: {key} "
+                                   f"{case[key]:,} > baseline {base[key]:,}")
+    for n, slope in results["per_frame"].items():
+        base = baseline.get("per_frame", {}).get(n)
+        if base is None:
+            continue
+        for key, slack in (("bytes_per_frame", BYTES_SLACK / 100), ("allocs_per_frame", ALLOCS_SLACK)):
+            if _exceeds(slope[key], base[key], slack, tolerance):
+                regressions.append(f"{n} elements: {key} {slope[key]:,.1f} > baseline {base[key]:,.1f}")
+    return regressions
+
+def load_baseline(backend: str, path: Path = BASELINE_FILE) -> dict:
+    """Baseline results for backend, or None if none were recorded."""
+    if not path.exists():
+        return None
+    return json.loads(path.read_text()).get(backend)
+
+def save_baseline(results: dict, path: Path = BASELINE_FILE):
+    baselines = json.loads(path.read_text()) if path.exists() else {}
+    baselines[results["backend"]] = results
+    path.write_text(json.dumps(baselines, indent=2) + "\n")
+
+def _mb(value: float) -> str:
+    return f"{value / (1024 * 1024):.1f}"
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory benchmark for the render path")
+    parser.add_argument("--backend", default="numpy", help="pil or numpy (pil is slow above a few elements)")
+    parser.add_argument("--elements", type=int, nargs="*", default=list(ELEMENT_COUNTS))
+    parser.add_argument("--durations", type=float, nargs="*", default=list(DURATIONS))
+    parser.add_argument("--check", action="store_true", help="Exit 1 if results regress against the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help=f"Record results in {BASELINE_FILE.name}")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.backend, args.elements, args.durations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Memory Benchmark ({args.backend} backend, {FPS} FPS)")
+        print("=" * 72)
+        print(f"{'elements':>8} {'seconds':>8} {'frames':>7} {'traced MB':>10} {'RSS MB':>8} {'images':>8} {'render s':>9}")
+        for c in results["cases"]:
+            print(f"{c['elements']:>8} {c['seconds']:>8.1f} {c['frames']:>7} {_mb(c['peak_traced_bytes']):>10} "
+                  f"{_mb(c['peak_rss_bytes']):>8} {c['images']:>8} {c['render_seconds']:>9.2f}")
+        print("-" * 72)
+        print(f"{'elements':>8} {'bytes/frame':>14} {'allocs/frame':>14}")
+        for n, slope in results["per_frame"].items():
+            print(f"{n:>8} {slope['bytes_per_frame']:>14,.0f} {slope['allocs_per_frame']:>14.2f}")
+        print("=" * 72)
+
+    if args.update_baseline:
+        save_baseline(results)
+        print(f"📝 Baseline for {args.backend} written to {BASELINE_FILE.name}")
+
+    if args.check:
+        baseline = load_baseline(args.backend)
+        if baseline is None:
+            print(f"❌ No {args.backend} baseline in {BASELINE_FILE.name}; run with --update-baseline first")
+            sys.exit(1)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} memory regressions (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ Within {args.tolerance:.0%} of the baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+NumPy compositing backend.
+
+Stickers are resized once and kept as premultiplied uint16 arrays, so a fade is
+an exact integer rescale of those arrays within the sprite's rect and blending
+only touches that rect of an RGB frame buffer. There is no per-frame RGBA canvas and no RGBA->RGB conversion.
+Sticker blends, fades included, round exactly like renderer.composite_frame,
+so frames match it pixel for pixel (see bench_compositor.py). The one
+exception is a sticker drawn over fading text: the PIL path's text paste
+lowers the canvas alpha there, which this backend doesn't model.
+"""
+
+import os
+from functools import lru_cache
+import numpy as np
+from PIL import Image
+from renderer import (
+    W, H, gen_clipart, load_text_sprite, calculate_image_size,
+    element_rect, element_alpha, element_typing_progress, element_offset,
+    element_reveal, load_reveal_order,
+)
+from model import Storyboard, ElementType
+
+class Sprite:
+    """
+    A sticker prepared for blending.
+
+    data holds RGB premultiplied by alpha without the /255 (so 0..65025) in
+    channels 0-2 and alpha in channel 3. Keeping the full product in uint16
+    means a blend rounds once, exactly like PIL's alpha_composite, and the
+    product stays exactly divisible by alpha for fades. order is the draw fx
+    reveal order (see renderer.reveal_order), attached on first use.
+    """
+    __slots__ = ("data", "width", "height", "order")
+
+    def __init__(self, img: Image.Image):
+        rgba = np.asarray(img.convert("RGBA"), dtype=np.uint16)
+        alpha = rgba[..., 3:]
+        self.data = np.empty_like(rgba)
+        self.data[..., :3] = rgba[..., :3] * alpha
+        self.data[..., 3:] = alpha
+        self.height, self.width = rgba.shape[:2]
+        self.order = None
+
+# Prepared sprites (a few MB each) kept per process, least recently used
+# evicted first; must cover the distinct stickers of one storyboard
+SPRITE_CACHE_SIZE = int(os.getenv("SPRITE_CACHE_SIZE", 128))
+TEXT_MASK_CACHE_SIZE = 256
+
+@lru_cache(maxsize=SPRITE_CACHE_SIZE)
+def load_sprite(prompt: str, width: int, height: int) -> Sprite:
+    """Sticker for prompt resized to width x height, prepared once per process."""
+    img = gen_clipart(prompt).resize((width, height), Image.LANCZOS)
+    return Sprite(img)
+
+@lru_cache(maxsize=TEXT_MASK_CACHE_SIZE)
+def load_text_masks(text: str, w: int, h: int) -> tuple:
+    """
+    Text sprite for a w x h area plus its masks as uint16 arrays.
+
+    Returns:
+        (TextSprite, text mask array, cursor mask array)
+    """
+    sprite = load_text_sprite(text, w, h)
+    return (sprite,
+            np.asarray(sprite.mask, dtype=np.uint16),
+            np.asarray(sprite.cursor, dtype=np.uint16))
+
+def clear_caches():
+    load_sprite.cache_clear()
+    load_text_masks.cache_clear()
+
+def new_frame() -> np.ndarray:
+    return np.full((H, W, 3), 255, dtype=np.uint8)
+
+def blend_sprite(frame: np.ndarray, sprite: Sprite, x: int, y: int, alpha: float = 1.0, reveal: int = None):
+    """
+    Source-over blend a sprite onto an opaque RGB frame in place.
+
+    Args:
+        frame: (H, W, 3) uint8 frame buffer
+        sprite: Prepared sprite
+        x, y: Top-left position, may lie partly off-canvas
+        alpha: Fade multiplier 0.0 to 1.0
+        reveal: Draw fx threshold 0-256; only pixels whose reveal order is below it show
+    """
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + sprite.width, frame.shape[1]), min(y + sprite.height, frame.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    src = sprite.data[y0 - y:y1 - y, x0 - x:x1 - x]
+    dst = frame[y0:y1, x0:x1]
+    if alpha < 1:
+        # Fade alpha with the truncating lookup the PIL path applies; rgb*a is
+        # stored exactly, so rescaling it by faded/a gives rgb*faded exactly
+        a = src[..., 3:]
+        faded = (np.arange(256) * alpha).astype(np.uint16)[a]
+        rgb = src[..., :3].astype(np.uint32) * faded // np.maximum(a, 1)
+        src = np.concatenate((rgb.astype(np.uint16), faded), axis=2)
+    if reveal is not None:
+        src = src * (sprite.order[y0 - y:y1 - y, x0 - x:x1 - x, None] < reveal)
+    # out = (s*a + d*(255-a)) / 255, which never exceeds 65025
+    dst[...] = (src[..., :3] + dst * (255 - src[..., 3:]) + 127) // 255
+
+def blend_ink(frame: np.ndarray, mask: np.ndarray, x: int, y: int):
+    """
+    Draw black ink through a uint16 coverage mask onto an RGB frame in place.
+    """
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + mask.shape[1], frame.shape[1]), min(y + mask.shape[0], frame.shape[0])
+    if x0 >= x1 or y0 >= y1:
+        return
+
+    coverage = mask[y0 - y:y1 - y, x0 - x:x1 - x, None]
+    dst = frame[y0:y1, x0:x1]
+    dst[...] = (dst * (255 - coverage) + 127) // 255
+
+def element_layers(t: float, storyboard: Storyboard) -> list:
+    """
+    What every visible element draws at time t, in paint order.
+
+    Returns:
+        List of (element index, layers). A layer is (source, crop_width, x, y, alpha, reveal):
+        source is a Sprite (blended with alpha and the draw fx reveal threshold)
+        or a uint16 text mask (black ink, alpha and reveal None); crop_width
+        limits a mask to its first columns or is None.
+    """
+    result = []
+    for i, el in enumerate(storyboard.elements):
+        if not (el.start <= t <= el.end):
+            continue
+
+        x, y, w, h = element_rect(el)
+        alpha = element_alpha(el, t)
+
+        if el.type is ElementType.TEXT:
+            sprite, text_mask, cursor_mask = load_text_masks(el.content, w, h)
+            layers = []
+            for mask, crop_width, left, top in sprite.placements(x, y, w, h, element_typing_progress(el, t, alpha)):
+                layers.append((text_mask if mask is sprite.mask else cursor_mask, crop_width, left, top, None, None))
+        else:
+            img_w, img_h = calculate_image_size(el.content, w, h)
+            sprite = load_sprite(el.content, img_w, img_h)
+            reveal = element_reveal(el, t)
+            if reveal is not None and sprite.order is None:
+                sprite.order = load_reveal_order(el.content, img_w, img_h)
+            layers = [(sprite, None, x, y + element_offset(el, t), alpha, reveal)]
+
+        result.append((i, layers))
+    return result
+
+def layer_bounds(layer: tuple) -> tuple:
+    """Canvas-clipped (x0, y0, x1, y1) a layer can touch, or None if off-canvas."""
+    source, crop_width, x, y, _, _ = layer
+    if isinstance(source, Sprite):
+        width, height = source.width, source.height
+    else:
+        height, width = source.shape
+    if crop_width is not None:
+        width = crop_width
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + width, W), min(y + height, H)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return (x0, y0, x1, y1)
+
+def draw_layer(frame: np.ndarray, layer: tuple, origin_x: int = 0, origin_y: int = 0):
+    """Draw a layer onto frame, whose top-left sits at (origin_x, origin_y) on the canvas."""
+    source, crop_width, x, y, alpha, reveal = layer
+    if isinstance(source, Sprite):
+        blend_sprite(frame, source, x - origin_x, y - origin_y, alpha, reveal)
+    else:
+        mask = source if crop_width is None else source[:, :crop_width]
+        blend_ink(frame, mask, x - origin_x, y - origin_y)
+
+def _layer_state(layers: list) -> tuple:
+    """
+    Comparable summary of an element's layers and the canvas rect they cover.
+    """
+    keys = tuple((id(layer[0]),) + layer[1:] for layer in layers)
+    bounds = [b for b in map(layer_bounds, layers) if b is not None]
+    if not bounds:
+        return keys, None
+    return keys, (min(b[0] for b in bounds), min(b[1] for b in bounds),
+                  max(b[2] for b in bounds), max(b[3] for b in bounds))
+
+def merge_rects(rects: list) -> list:
+    """Union overlapping or touching (x0, y0, x1, y1) rects until none overlap."""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                a, b = rects[i], rects[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    rects[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+class FrameCompositor:
+    """
+    Dirty-rectangle renderer for consecutive frames of one storyboard.
+
+    Keeps the previous frame buffer and the layers each element drew into it.
+    Each frame restores only the rects of elements whose layers changed (grid
+    rect, slide_up offset, fade, draw reveal, typing) to the white template and
+    recomposites whatever overlaps them, so per-frame work scales with the
+    animated area rather than the full canvas.
+    """
+
+    # Past this share of the canvas one full redraw beats many small ones
+    FULL_REDRAW_FRACTION = 0.5
+
+    def __init__(self, storyboard):
+        self.storyboard = Storyboard.coerce(storyboard)
+        self.frame = new_frame()
+        self.states = None  # element index -> (layer keys, bounds) of the last frame
+
+    def render(self, t: float) -> np.ndarray:
+        """
+        Render the frame at time t into the reused buffer.
+
+        Returns:
+            The (H, W, 3) uint8 buffer; copy it before rendering the next frame
+            if it needs to be kept
+        """
+        layers = element_layers(t, self.storyboard)
+        states = {i: _layer_state(element) for i, element in layers}
+
+        if self.states is None:
+            dirty = [(0, 0, W, H)]
+        else:
+            dirty = []
+            for i in states.keys() | self.states.keys():
+                old, new = self.states.get(i), states.get(i)
+                if old == new:
+                    continue
+                for state in (old, new):
+                    if state is not None and state[1] is not None:
+                        dirty.append(state[1])
+            dirty = merge_rects(dirty)
+            if sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in dirty) > self.FULL_REDRAW_FRACTION * W * H:
+                dirty = [(0, 0, W, H)]
+
+        for x0, y0, x1, y1 in dirty:
+            region = self.frame[y0:y1, x0:x1]
+            region.fill(255)
+            for _, element in layers:
+                for layer in element:
+                    bounds = layer_bounds(layer)
+                    if bounds and bounds[0] < x1 and x0 < bounds[2] and bounds[1] < y1 and y0 < bounds[3]:
+                        draw_layer(region, layer, x0, y0)
+
+        self.states = states
+        return self.frame
+
+def composite_frame_np(t: float, storyboard, frame: np.ndarray = None) -> np.ndarray:
+    """
+    Render one RGB frame at time t (seconds) as a (H, W, 3) uint8 array.
+
+    Same layout and effects as renderer.composite_frame. Use FrameCompositor
+    when rendering consecutive frames.
+    """
+    if frame is None:
+        frame = new_frame()
+    else:
+        frame.fill(255)
+
+    for _, layers in element_layers(t, Storyboard.coerce(storyboard)):
+        for layer in layers:
+            draw_layer(frame, layer)
+
+    return frame
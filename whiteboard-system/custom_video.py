@@ -6,9 +6,10 @@ Use this to create videos from any narration script.
 
 import os
 import json
+import logging
 from dotenv import load_dotenv
 from storyboard import build_storyboard
-from video import render_video
+from video import render_video, log_progress
 
 load_dotenv()
 
@@ -29,7 +30,7 @@ def create_video_from_narration(narration: str, output_file: str = "custom_video
         print("Storyboard:", json.dumps(sb, indent=2))
         
         print("Rendering video...")
-        render_video(sb, output_path=output_file, fps=30, audio_path=None)
+        render_video(sb, output_path=output_file, fps=30, audio_path=None, progress=log_progress)
         print(f"✅ Done! Check {output_file}")
         
         return output_file
@@ -90,4 +91,5 @@ def main():
     print("3. Or import this module and call create_video_from_narration()")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main()
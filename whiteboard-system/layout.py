@@ -0,0 +1,307 @@
+"""
+Grid layout solver.
+
+Places any number of text and image elements on the GRID_COLS x GRID_ROWS
+grid with no overlaps. A page's occupancy is one bitmask per grid row, so
+testing a candidate rect costs a few integer ANDs. Every placed element
+reserves a SPACING_CELLS halo, which keeps the storyboard prompt's minimum
+spacing between neighbours. An element that doesn't fit is shrunk towards its
+minimum size, and when even that fails the remaining images, along with any
+text that would crowd them out, move to a new page that replaces the
+previous one later in the scene.
+"""
+
+from model import GRID_COLS, GRID_ROWS
+
+# Empty cells kept between any two elements (0.1 of the canvas ~ 1 cell)
+SPACING_CELLS = 1
+
+# Smallest size in cells (columns, rows) an element is shrunk to before paging
+MIN_IMAGE_CELLS = (2, 2)
+MIN_TEXT_CELLS = (4, 1)
+
+# The first text element is the title across the top
+TITLE_GEOMETRY = {"x": 0.5, "y": 0.1, "w": 0.8, "h": 0.25}
+
+# Image stagger within a page: 1s apart for a few images, tighter for more
+STAGGER_SECONDS = 1.0
+DENSE_STAGGER_SECONDS = 0.8
+FIRST_IMAGE_DELAY = 1.0
+
+FULL_ROW = (1 << GRID_COLS) - 1
+
+def grid_rect(el: dict) -> tuple:
+    """
+    Grid cells (col, row, columns, rows) an element covers, mapped exactly
+    like renderer.element_rect.
+    """
+    gw = min(GRID_COLS, max(1, int(el["w"] * GRID_COLS)))
+    gh = min(GRID_ROWS, max(1, int(el["h"] * GRID_ROWS)))
+    col = int(el["x"] * GRID_COLS - gw / 2)
+    row = int(el["y"] * GRID_ROWS)
+    return col, row, gw, gh
+
+def grid_fractions(col: int, row: int, gw: int, gh: int) -> dict:
+    """
+    Canvas fractions that grid_rect (and the renderer) map back to exactly
+    these cells. Each value sits half a cell inside its truncation boundary.
+    """
+    return {
+        "x": round((col + gw / 2 + 0.5) / GRID_COLS, 4),
+        "y": round((row + 0.5) / GRID_ROWS, 4),
+        "w": round(min(1.0, (gw + 0.5) / GRID_COLS), 4),
+        "h": round(min(1.0, (gh + 0.5) / GRID_ROWS), 4),
+    }
+
+class Occupancy:
+    """
+    Occupied cells of one page, one GRID_COLS-bit mask per row, plus the sizes
+    already found not to fit (cells only fill up, so those never will).
+    """
+    __slots__ = ("rows", "full_sizes")
+
+    def __init__(self, rows: list = None):
+        self.rows = list(rows) if rows else [0] * GRID_ROWS
+        self.full_sizes = []
+
+    def copy(self) -> "Occupancy":
+        return Occupancy(self.rows)
+
+    def fits(self, col: int, row: int, gw: int, gh: int) -> bool:
+        if col < 0 or row < 0 or col + gw > GRID_COLS or row + gh > GRID_ROWS:
+            return False
+        mask = ((1 << gw) - 1) << col
+        for r in range(row, row + gh):
+            if self.rows[r] & mask:
+                return False
+        return True
+
+    def mark(self, col: int, row: int, gw: int, gh: int):
+        """Occupy a rect plus its spacing halo."""
+        c0, c1 = max(0, col - SPACING_CELLS), min(GRID_COLS, col + gw + SPACING_CELLS)
+        mask = ((1 << (c1 - c0)) - 1) << c0
+        for r in range(max(0, row - SPACING_CELLS), min(GRID_ROWS, row + gh + SPACING_CELLS)):
+            self.rows[r] |= mask
+
+    def find(self, gw: int, gh: int, center_first: bool = False):
+        """Top-most free (col, row) for a gw x gh rect, or None."""
+        if any(gw >= w and gh >= h for w, h in self.full_sizes):
+            return None
+        for row in range(GRID_ROWS - gh + 1):
+            used = 0
+            for r in range(row, row + gh):
+                used |= self.rows[r]
+            # Bit c of starts is set when columns c..c+gw-1 are all free
+            free = ~used & FULL_ROW
+            starts = free
+            for k in range(1, gw):
+                starts &= free >> k
+            if not starts:
+                continue
+            if center_first:
+                middle = (GRID_COLS - gw) / 2
+                cols = [c for c in range(GRID_COLS - gw + 1) if starts >> c & 1]
+                return min(cols, key=lambda c: abs(c - middle)), row
+            return (starts & -starts).bit_length() - 1, row
+        self.full_sizes.append((gw, gh))
+        return None
+
+def _sizes(gw: int, gh: int, minimum: tuple):
+    """Candidate sizes from (gw, gh) down to minimum, shrinking the larger side first."""
+    min_w, min_h = min(minimum[0], gw), min(minimum[1], gh)
+    while True:
+        yield gw, gh
+        if gw <= min_w and gh <= min_h:
+            return
+        if gh <= min_h or (gw > min_w and gw / GRID_COLS >= gh / GRID_ROWS):
+            gw -= 1
+        else:
+            gh -= 1
+
+def _place(occupancy: Occupancy, rect: tuple, minimum: tuple, keep_position: bool = False,
+           center_first: bool = False):
+    """
+    Place a rect (at its requested cells if keep_position and they're free)
+    at the first free spot for the largest size that fits. Marks and returns
+    the cells, or None.
+    """
+    col, row, gw, gh = rect
+    if keep_position and occupancy.fits(col, row, gw, gh):
+        occupancy.mark(col, row, gw, gh)
+        return rect
+    for size in _sizes(gw, gh, minimum):
+        spot = occupancy.find(*size, center_first=center_first)
+        if spot is not None:
+            occupancy.mark(*spot, *size)
+            return spot + size
+    return None
+
+def _center_rows(persistent: Occupancy, rects: list) -> list:
+    """Center each row of rects (same top row) horizontally where the cells are free."""
+    rects = list(rects)
+    for top in sorted({r[1] for r in rects}):
+        members = [i for i, r in enumerate(rects) if r[1] == top]
+        x0 = min(rects[i][0] for i in members)
+        x1 = max(rects[i][0] + rects[i][2] for i in members)
+        dx = (GRID_COLS - (x1 - x0)) // 2 - x0
+        if dx == 0:
+            continue
+        others = persistent.copy()
+        for i, rect in enumerate(rects):
+            if i not in members:
+                others.mark(*rect)
+        moved = [(rects[i][0] + dx,) + rects[i][1:] for i in members]
+        if all(others.fits(*rect) for rect in moved):
+            for i, rect in zip(members, moved):
+                rects[i] = rect
+    return rects
+
+def _center(persistent: Occupancy, rects: list) -> list:
+    """
+    Shift one page's rects together so the group sits centered in the space
+    below the persistent elements, if that space is free.
+    """
+    x0 = min(r[0] for r in rects)
+    x1 = max(r[0] + r[2] for r in rects)
+    y0 = min(r[1] for r in rects)
+    y1 = max(r[1] + r[3] for r in rects)
+    dx = (GRID_COLS - (x1 - x0)) // 2 - x0
+    dy = (GRID_ROWS - y1) // 2
+    for shift_x, shift_y in ((dx, dy), (dx, 0), (0, dy)):
+        moved = [(c + shift_x, r + shift_y, w, h) for c, r, w, h in rects]
+        if all(persistent.fits(*rect) for rect in moved):
+            return moved
+    return rects
+
+def _room(occupancy: Occupancy, sizes: list) -> bool:
+    """Whether each of sizes (columns, rows) would fit somewhere on its own."""
+    probe = occupancy.copy()
+    return all(probe.find(*size) is not None for size in sizes)
+
+def _place_texts(persistent: Occupancy, texts: list, attempt: int) -> tuple:
+    """
+    Place secondary text around the title, less faithfully on each attempt:
+    0 keeps requested cells where free, 1 moves and shrinks as needed, 2 moves
+    at MIN_TEXT_CELLS. Returns the occupancy and a rect (or None) per text.
+    """
+    occupancy = persistent.copy()
+    rects = []
+    for el in texts:
+        rect = grid_rect(el)
+        if attempt == 2:
+            rect = rect[:2] + (min(rect[2], MIN_TEXT_CELLS[0]), min(rect[3], MIN_TEXT_CELLS[1]))
+        rects.append(_place(occupancy, rect, MIN_TEXT_CELLS, keep_position=attempt == 0, center_first=True))
+    return occupancy, rects
+
+def solve_layout(elements: list, visual_end: float) -> list:
+    """
+    Lay out a scene's elements on the grid without overlaps.
+
+    Text elements stay on screen for the whole scene: the first becomes the
+    title (TITLE_GEOMETRY, 0 to visual_end), the rest keep their requested
+    cells when free, otherwise move and shrink towards MIN_TEXT_CELLS until a
+    minimum-size image still fits. Images are packed row by row at their
+    requested size, shrinking as needed, and each page's group is centered;
+    images that don't fit start a new page, and pages split the scene's time
+    evenly with images staggering in on each. Text that can't stay on screen
+    without crowding out the images is paged in with them instead.
+
+    Args:
+        elements: Element dicts (x, y, w, h as canvas fractions)
+        visual_end: When elements should be gone, in seconds
+
+    Returns:
+        New element dicts, text first then images in their original order
+    """
+    texts = [dict(el) for el in elements if el["type"] == "text"]
+    images = [dict(el) for el in elements if el["type"] != "text"]
+
+    persistent = Occupancy()
+    if texts:
+        texts[0].update(TITLE_GEOMETRY)
+        texts[0]["start"] = 0.0
+        texts[0]["end"] = visual_end
+        rect = grid_rect(texts[0])
+        persistent.mark(*rect)
+        texts[0].update(grid_fractions(*rect))
+
+    secondary = texts[1:]
+    needed = [MIN_IMAGE_CELLS] if images else []
+    for attempt in range(3):
+        occupancy, rects = _place_texts(persistent, secondary, attempt)
+        if None not in rects and _room(occupancy, needed):
+            break
+
+    # Whatever still doesn't fit is paged with the images, latest text first
+    kept = [i for i, rect in enumerate(rects) if rect is not None]
+    while kept and not _room(occupancy, needed + ([MIN_TEXT_CELLS] if len(kept) < len(secondary) else [])):
+        kept.pop()
+        occupancy = persistent.copy()
+        for i in kept:
+            occupancy.mark(*rects[i])
+    persistent = occupancy
+
+    paged = []
+    for i, el in enumerate(secondary):
+        if i in kept:
+            el.update(grid_fractions(*rects[i]))
+            el["start"] = min(max(0.0, float(el["start"])), visual_end / 2)
+            el["end"] = visual_end
+        else:
+            paged.append(el)
+    paged += images
+
+    # Pack paged elements page by page
+    pages = []
+    page, placed = persistent.copy(), []
+    for el in paged:
+        minimum = MIN_TEXT_CELLS if el["type"] == "text" else MIN_IMAGE_CELLS
+        rect = _place(page, grid_rect(el), minimum)
+        if rect is None and placed:
+            pages.append(placed)
+            page, placed = persistent.copy(), []
+            rect = _place(page, grid_rect(el), minimum)
+        if rect is None:
+            # _room guarantees an empty page fits any element at its minimum size
+            raise RuntimeError(f"Layout left no room for {el['type']} '{el['content']}'")
+        placed.append((el, rect))
+    if placed:
+        pages.append(placed)
+
+    page_length = visual_end / max(1, len(pages))
+    for p, placed in enumerate(pages):
+        rects = _center(persistent, _center_rows(persistent, [rect for _, rect in placed]))
+        page_start = p * page_length
+        page_end = visual_end if p == len(pages) - 1 else page_start + page_length
+
+        # Every element on a page has appeared by its midpoint
+        lead = min(FIRST_IMAGE_DELAY, page_length / 4) if p == 0 else 0.0
+        stagger = STAGGER_SECONDS if len(placed) <= 4 else DENSE_STAGGER_SECONDS
+        if len(placed) > 1:
+            stagger = min(stagger, (page_length / 2 - lead) / (len(placed) - 1))
+
+        for i, ((el, _), rect) in enumerate(zip(placed, rects)):
+            el.update(grid_fractions(*rect))
+            el["start"] = round(page_start + lead + i * stagger, 3)
+            el["end"] = round(page_end, 3)
+
+    return texts + images
+
+def find_overlaps(elements: list) -> list:
+    """
+    Pairs (i, j) of elements that are on screen together and whose cells,
+    including the spacing halo, overlap. Quadratic; meant for checking
+    layouts, not for building them.
+    """
+    rects = [grid_rect(el) for el in elements]
+    overlaps = []
+    for i in range(len(elements)):
+        a, ra = elements[i], rects[i]
+        for j in range(i + 1, len(elements)):
+            b, rb = elements[j], rects[j]
+            if not (a["start"] < b["end"] and b["start"] < a["end"]):
+                continue
+            if (ra[0] < rb[0] + rb[2] + SPACING_CELLS and rb[0] < ra[0] + ra[2] + SPACING_CELLS and
+                    ra[1] < rb[1] + rb[3] + SPACING_CELLS and rb[1] < ra[1] + ra[3] + SPACING_CELLS):
+                overlaps.append((i, j))
+    return overlaps
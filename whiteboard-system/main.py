@@ -1,14 +1,17 @@
 import os
 import json
+import logging
 import sys
 from dotenv import load_dotenv
 from storyboard import build_storyboard
-from video import render_video
+from video import render_video, log_progress
 from examples import get_example, list_examples
 
 load_dotenv()
 
 def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Check if custom narration or example name was provided
     if len(sys.argv) > 1:
         arg = sys.argv[1]
@@ -40,7 +43,7 @@ def main():
         print("Storyboard:", json.dumps(sb, indent=2))
         
         print("Rendering video...")
-        render_video(sb, output_path=output_file, fps=30, audio_path=None, target_duration=duration)
+        render_video(sb, output_path=output_file, fps=30, audio_path=None, target_duration=duration, progress=log_progress)
         print(f"Done! Check {output_file}")
         
     except Exception as e:
@@ -0,0 +1,154 @@
+"""
+Typed storyboard model.
+
+Storyboards arrive as JSON dicts from the chat model, but every render reads
+each element's fields once per frame. Element and Storyboard are frozen,
+slotted dataclasses validated once at load time, so the hot loop does plain
+attribute reads and a bad storyboard fails before the first frame instead of
+mid-render. Public entry points accept either form and convert dicts with
+Storyboard.coerce.
+"""
+
+import json
+from dataclasses import dataclass, replace
+from enum import Enum
+
+try:
+    import orjson
+except ImportError:  # optional, only makes (de)serialization faster
+    orjson = None
+
+class ElementType(str, Enum):
+    TEXT = "text"
+    IMAGE = "image"
+
+class Fx(str, Enum):
+    NONE = "none"
+    FADE = "fade"
+    SLIDE_UP = "slide_up"
+    DRAW = "draw"
+
+# Allowed slack when comparing element times against the scene duration
+TIME_EPSILON = 1e-9
+
+# Layout grid that element fractions snap to (see renderer.element_rect)
+GRID_COLS = 12  # 12-column grid system
+GRID_ROWS = 8   # 8-row grid system
+
+@dataclass(frozen=True)
+class Element:
+    """
+    One text or image element.
+
+    x is the horizontal center and y the top edge; x, y, w and h are fractions
+    of the canvas. Times are seconds from the start of the scene.
+    """
+    __slots__ = ("type", "content", "start", "end", "x", "y", "w", "h", "fx")
+    type: ElementType
+    content: str
+    start: float
+    end: float
+    x: float
+    y: float
+    w: float
+    h: float
+    fx: Fx
+
+    def __post_init__(self):
+        if not isinstance(self.content, str) or not self.content.strip():
+            raise ValueError("content must be a non-empty string")
+        if not 0 <= self.start < self.end:
+            raise ValueError(f"needs 0 <= start < end, got start={self.start} end={self.end}")
+        for name in ("x", "y", "w", "h"):
+            value = getattr(self, name)
+            if not 0 <= value <= 1:
+                raise ValueError(f"{name}={value} is not a canvas fraction in [0, 1]")
+        if self.w <= 0 or self.h <= 0:
+            raise ValueError(f"needs w > 0 and h > 0, got w={self.w} h={self.h}")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Element":
+        try:
+            return cls(
+                type=ElementType(data["type"]),
+                content=data["content"],
+                start=float(data["start"]),
+                end=float(data["end"]),
+                x=float(data["x"]),
+                y=float(data["y"]),
+                w=float(data["w"]),
+                h=float(data["h"]),
+                fx=Fx(data.get("fx", "none")),
+            )
+        except KeyError as e:
+            raise ValueError(f"missing field {e}") from None
+        except TypeError as e:
+            raise ValueError(str(e)) from None
+
+    def to_dict(self) -> dict:
+        return {
+            "type": self.type.value,
+            "content": self.content,
+            "start": self.start,
+            "end": self.end,
+            "x": self.x,
+            "y": self.y,
+            "w": self.w,
+            "h": self.h,
+            "fx": self.fx.value,
+        }
+
+@dataclass(frozen=True)
+class Storyboard:
+    """A validated scene: its duration and elements in paint order."""
+    __slots__ = ("scene_duration", "elements")
+    scene_duration: float
+    elements: tuple
+
+    def __post_init__(self):
+        if not self.scene_duration > 0:
+            raise ValueError(f"scene_duration must be positive, got {self.scene_duration}")
+        for i, el in enumerate(self.elements):
+            if el.end > self.scene_duration + TIME_EPSILON:
+                raise ValueError(f"element {i} ends at {el.end}s, after the scene ({self.scene_duration}s)")
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Storyboard":
+        """Validate a storyboard dict; raises ValueError naming the bad element."""
+        if "scene_duration" not in data or "elements" not in data:
+            raise ValueError("storyboard needs 'scene_duration' and 'elements'")
+        elements = []
+        for i, el in enumerate(data["elements"]):
+            try:
+                elements.append(Element.from_dict(el))
+            except ValueError as e:
+                raise ValueError(f"element {i}: {e}") from None
+        return cls(float(data["scene_duration"]), tuple(elements))
+
+    @classmethod
+    def coerce(cls, storyboard, scene_duration: float = None) -> "Storyboard":
+        """
+        Accept a Storyboard or a storyboard dict, optionally overriding its
+        duration before validation.
+        """
+        if isinstance(storyboard, cls):
+            return storyboard if scene_duration is None else storyboard.with_duration(scene_duration)
+        if scene_duration is not None:
+            storyboard = {**storyboard, "scene_duration": scene_duration}
+        return cls.from_dict(storyboard)
+
+    @classmethod
+    def from_json(cls, text) -> "Storyboard":
+        """Parse and validate JSON text or bytes."""
+        return cls.from_dict(orjson.loads(text) if orjson is not None else json.loads(text))
+
+    def to_dict(self) -> dict:
+        return {"scene_duration": self.scene_duration, "elements": [el.to_dict() for el in self.elements]}
+
+    def to_json(self) -> str:
+        if orjson is not None:
+            return orjson.dumps(self.to_dict()).decode()
+        return json.dumps(self.to_dict(), separators=(",", ":"))
+
+    def with_duration(self, scene_duration: float) -> "Storyboard":
+        return replace(self, scene_duration=float(scene_duration))
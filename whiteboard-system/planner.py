@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Render cost planner.
+Predicts frame count, CPU time per stage, peak memory and the sticker / LLM
+calls a storyboard needs before committing a worker to it. Per-unit costs are
+calibrated from the timings render_video records after every uninterrupted
+run.
+
+Usage: python planner.py storyboard.json [--fps 30] [--duration 8] [--backend numpy]
+"""
+
+import argparse
+import json
+import os
+import statistics
+from pathlib import Path
+import numpy as np
+from renderer import W, H, element_rect, calculate_image_size
+from stickers import lookup_sticker
+from model import Storyboard, ElementType
+
+# Where render_video appends one JSON line of timings per render
+TIMINGS_FILE = os.getenv("RENDER_TIMINGS", ".render_timings.jsonl")
+
+# Records used for calibration, newest first
+CALIBRATION_WINDOW = 200
+
+# Uncalibrated per-unit costs in seconds
+DEFAULT_COSTS = {
+    "llm_call": 5.0,               # one storyboard chat completion
+    "sticker": 15.0,               # one image generation plus background removal
+    "pil": (0.002, 0.045),         # (per frame, per visible element-frame)
+    "numpy": (0.002, 0.003),
+    "encode": (0.5, 0.012),        # (fixed ffmpeg startup, per frame) for libx264 at 1080p
+}
+
+# Process overhead before any frame: interpreter, moviepy, numpy, fonts
+BASE_MEMORY = 150 * 1024 * 1024
+
+# Canvas-sized buffers alive while rendering: frame, RGBA canvas, encoder pipe copies
+FRAME_BUFFERS = 4
+
+def visible_frames(el, total: int, fps: int) -> int:
+    """Number of frames i in [0, total) with start <= i/fps <= end."""
+    first = max(0, int(np.ceil(el.start * fps - 1e-9)))
+    last = min(total - 1, int(np.floor(el.end * fps + 1e-9)))
+    return max(0, last - first + 1)
+
+def workload(storyboard, fps: int = 30, target_duration: float = None) -> dict:
+    """
+    Size of a render in the units the cost model uses.
+    """
+    storyboard = Storyboard.coerce(storyboard)
+    duration = float(target_duration if target_duration is not None else storyboard.scene_duration)
+    # render_video adds a 0.1s buffer after the scene
+    frames = int((duration + 0.1) * fps)
+    elements = storyboard.elements
+    images = [el for el in elements if el.type is ElementType.IMAGE]
+    texts = [el for el in elements if el.type is ElementType.TEXT]
+    return {
+        "frames": frames,
+        "element_frames": sum(visible_frames(el, frames, fps) for el in elements),
+        "images": len(images),
+        "texts": len(texts),
+        "text_chars": sum(len(el.content) for el in texts),
+        "unique_prompts": list(dict.fromkeys(el.content for el in images)),
+    }
+
+def load_timings(path: str = TIMINGS_FILE) -> list:
+    """Recorded render timings, newest first."""
+    p = Path(path)
+    if not p.exists():
+        return []
+    records = []
+    for line in p.read_text().splitlines():
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue
+    return records[::-1][:CALIBRATION_WINDOW]
+
+def record_timings(record: dict, path: str = TIMINGS_FILE):
+    """Append one render's timings for later calibration."""
+    with open(path, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+def calibrate(records: list) -> dict:
+    """
+    Fit per-unit costs from recorded renders, falling back to defaults.
+
+    Compositing time is fit per backend as a*frames + b*element_frames by least
+    squares, encoding as fixed + per-frame the same way; sticker and memory
+    costs use medians of per-unit ratios.
+    """
+    costs = dict(DEFAULT_COSTS)
+    costs["memory_scale"] = 1.0
+
+    for backend in ("pil", "numpy"):
+        rows = [r for r in records if r.get("backend") == backend and r.get("frames")]
+        if not rows:
+            continue
+        if len(rows) >= 2:
+            A = np.array([[r["frames"], r["element_frames"]] for r in rows], dtype=float)
+            b = np.array([r["composite_seconds"] for r in rows], dtype=float)
+            fit, *_ = np.linalg.lstsq(A, b, rcond=None)
+            if (fit >= 0).all():
+                costs[backend] = (float(fit[0]), float(fit[1]))
+                continue
+        # Too few or too similar runs to separate the terms: scale the defaults
+        default = DEFAULT_COSTS[backend]
+        scale = statistics.median(
+            r["composite_seconds"] / (default[0] * r["frames"] + default[1] * r["element_frames"]) for r in rows
+        )
+        costs[backend] = (default[0] * scale, default[1] * scale)
+
+    rows = [r for r in records if r.get("frames")]
+    if len({r["frames"] for r in rows}) >= 2:
+        A = np.array([[1.0, r["frames"]] for r in rows])
+        b = np.array([r["encode_seconds"] for r in rows], dtype=float)
+        fit, *_ = np.linalg.lstsq(A, b, rcond=None)
+        if (fit >= 0).all():
+            costs["encode"] = (float(fit[0]), float(fit[1]))
+
+    stickers = [r["sticker_seconds"] / r["stickers_generated"] for r in records if r.get("stickers_generated")]
+    if stickers:
+        costs["sticker"] = statistics.median(stickers)
+
+    memory = [r["peak_rss"] / r["estimated_memory"] for r in records if r.get("peak_rss") and r.get("estimated_memory")]
+    if memory:
+        costs["memory_scale"] = statistics.median(memory)
+
+    return costs
+
+def estimate_memory(storyboard, frames: int) -> int:
+    """
+    Bytes render_video needs at peak before calibration.
+
+    Frames stream to the encoder, so only a handful of canvas-sized buffers
+    are live at once, plus one decoded sticker and a prepared sprite per image
+    element. frames is accepted for calibration records but no longer scales it.
+    """
+    sprites = 0
+    for el in Storyboard.coerce(storyboard).elements:
+        if el.type is ElementType.IMAGE:
+            _, _, w, h = element_rect(el)
+            img_w, img_h = calculate_image_size(el.content, w, h)
+            sprites += img_w * img_h * 4 * 2 + 1024 * 1024 * 4
+    return BASE_MEMORY + FRAME_BUFFERS * W * H * 4 + sprites
+
+def plan_render(storyboard, fps: int = 30, target_duration: float = None, backend: str = "pil",
+                needs_storyboard: bool = False, timings_path: str = TIMINGS_FILE) -> dict:
+    """
+    Dry-run a render: estimate its cost without drawing a frame.
+
+    Args:
+        storyboard: Storyboard or storyboard dict (for narration-only jobs pass
+                    a typical one and needs_storyboard=True)
+        fps: Frames per second
+        target_duration: Overrides scene_duration like render_video
+        backend: "pil" or "numpy"
+        needs_storyboard: Count the chat call that would generate the storyboard
+        timings_path: Recorded timings used for calibration
+
+    Returns:
+        Dict with frames, stage_seconds, total_seconds, peak_memory_bytes,
+        uncached_stickers, llm_calls and the calibration sample size
+    """
+    storyboard = Storyboard.coerce(storyboard, target_duration)
+    records = load_timings(timings_path)
+    costs = calibrate(records)
+    work = workload(storyboard, fps, target_duration)
+
+    uncached = [p for p in work["unique_prompts"] if lookup_sticker(p)[1] == "miss"]
+    llm_calls = 1 if needs_storyboard else 0
+
+    per_frame, per_element_frame = costs[backend]
+    stages = {
+        "storyboard": llm_calls * costs["llm_call"],
+        "stickers": len(uncached) * costs["sticker"],
+        "composite": work["frames"] * per_frame + work["element_frames"] * per_element_frame,
+        "encode": costs["encode"][0] + work["frames"] * costs["encode"][1],
+    }
+
+    memory = estimate_memory(storyboard, work["frames"])
+
+    return {
+        "frames": work["frames"],
+        "fps": fps,
+        "backend": backend,
+        "elements": {"images": work["images"], "texts": work["texts"], "text_chars": work["text_chars"]},
+        "stage_seconds": {k: round(v, 3) for k, v in stages.items()},
+        "total_seconds": round(sum(stages.values()), 3),
+        "estimated_memory_bytes": memory,
+        "peak_memory_bytes": int(memory * costs["memory_scale"]),
+        "uncached_stickers": len(uncached),
+        "uncached_prompts": uncached,
+        "llm_calls": llm_calls,
+        "image_api_calls": len(uncached),
+        "calibration_records": len(records),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate render cost without rendering")
+    parser.add_argument("storyboard", help="Storyboard JSON file")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=None)
+    parser.add_argument("--backend", default=os.getenv("RENDER_BACKEND", "pil"))
+    parser.add_argument("--needs-storyboard", action="store_true",
+                        help="Count the chat call for a narration-only job")
+    args = parser.parse_args()
+
+    sb = Storyboard.from_json(Path(args.storyboard).read_bytes())
+    plan = plan_render(sb, fps=args.fps, target_duration=args.duration, backend=args.backend,
+                       needs_storyboard=args.needs_storyboard)
+    print(json.dumps(plan, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,16 @@
 import base64
 import io
 import hashlib
+from functools import lru_cache
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 from openai import OpenAI
 from pathlib import Path
+from model import Storyboard, Element, ElementType, Fx, GRID_COLS, GRID_ROWS
 
 W, H = 1920, 1080
 
-# Grid system for layout management
-GRID_COLS = 12  # 12-column grid system
-GRID_ROWS = 8   # 8-row grid system
+# Grid system for layout management (GRID_COLS x GRID_ROWS, see model.py)
 GRID_CELL_W = W // GRID_COLS  # 160px per column
 GRID_CELL_H = H // GRID_ROWS  # 135px per row
 
@@ -50,6 +51,41 @@ def grid_to_pixels(col: int, row: int, width: int = 1, height: int = 1) -> tuple
     h = height * GRID_CELL_H
     return (x, y, w, h)
 
+# Shipped with the repo, so it rasterizes the same on every host
+BUNDLED_FONT = str(Path(__file__).resolve().parent / "assets" / "fonts" / "DejaVuSans-Bold.ttf")
+
+# Try common system fonts first
+FONT_PATHS = [
+    "/System/Library/Fonts/Helvetica.ttc",  # macOS
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
+    "C:/Windows/Fonts/arial.ttf",  # Windows
+    BUNDLED_FONT  # Local fallback
+]
+
+@lru_cache(maxsize=512)
+def load_font(font_size: int, font_path: str = None):
+    """
+    Load the first available font at the given size.
+    
+    Fonts are cached per (size, path) so repeated frames don't hit the filesystem.
+    """
+    font_paths = [font_path] + FONT_PATHS if font_path else FONT_PATHS
+    for path in font_paths:
+        try:
+            return ImageFont.truetype(path, font_size)
+        except (OSError, IOError):
+            continue
+    return ImageFont.load_default()
+
+def use_bundled_font():
+    """
+    Rasterize all text with BUNDLED_FONT only, e.g. so shards rendered on
+    different hosts produce identical pixels. Clears the font and text caches.
+    """
+    FONT_PATHS[:] = [BUNDLED_FONT]
+    load_font.cache_clear()
+    load_text_sprite.cache_clear()
+
 def calculate_text_size(text: str, max_width: int, max_height: int) -> int:
     """
     Calculate optimal font size for text to fit within given dimensions.
@@ -62,50 +98,13 @@ def calculate_text_size(text: str, max_width: int, max_height: int) -> int:
     Returns:
         Optimal font size
     """
-    # Start with a reasonable font size
-    font_size = 100
-    
-    try:
-        # Try common system fonts first
-        font_paths = [
-            "/System/Library/Fonts/Helvetica.ttc",  # macOS
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
-            "C:/Windows/Fonts/arial.ttf",  # Windows
-            "assets/fonts/DejaVuSans-Bold.ttf"  # Local fallback
-        ]
-        font = None
-        for path in font_paths:
-            try:
-                font = ImageFont.truetype(path, font_size)
-                break
-            except (OSError, IOError):
-                continue
-        
-        if font is None:
-            font = ImageFont.load_default()
-    except:
-        font = ImageFont.load_default()
-    
     # Binary search for optimal font size
     min_size = 50
     max_size = 500
     
     while min_size < max_size:
         mid_size = (min_size + max_size + 1) // 2
-        try:
-            # Try common system fonts first
-            test_font = None
-            for path in font_paths:
-                try:
-                    test_font = ImageFont.truetype(path, mid_size)
-                    break
-                except (OSError, IOError):
-                    continue
-            
-            if test_font is None:
-                test_font = ImageFont.load_default()
-        except:
-            test_font = ImageFont.load_default()
+        test_font = load_font(mid_size)
         
         # Get text bounding box
         bbox = test_font.getbbox(text)
@@ -139,37 +138,13 @@ def calculate_image_size(prompt: str, max_width: int, max_height: int) -> tuple:
     
     return (size, size)
 
-def draw_text(img: Image.Image, text: str, x: int, y: int, w: int, h: int, color=(0,0,0,255), font_path=None, font_size=120, typing_progress=1.0):
+def layout_text(text: str, x: int, y: int, w: int, h: int, font, typing_progress=1.0) -> tuple:
     """
-    Draw text with optional typewriter effect.
+    Work out what draw_text shows and where.
     
-    Args:
-        typing_progress: 0.0 to 1.0, where 1.0 shows full text
+    Returns:
+        (display_text, text_x, text_y) where display_text includes the cursor while typing
     """
-    draw = ImageDraw.Draw(img)
-    
-    # Try common system fonts first
-    font_paths = [
-        "/System/Library/Fonts/Helvetica.ttc",  # macOS
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",  # Linux
-        "C:/Windows/Fonts/arial.ttf",  # Windows
-        "assets/fonts/DejaVuSans-Bold.ttf"  # Local fallback
-    ]
-    
-    if font_path:
-        font_paths.insert(0, font_path)
-    
-    font = None
-    for path in font_paths:
-        try:
-            font = ImageFont.truetype(path, font_size)
-            break
-        except (OSError, IOError):
-            continue
-    
-    if font is None:
-        font = ImageFont.load_default()
-    
     # Calculate how many characters to show for typewriter effect
     chars_to_show = int(len(text) * typing_progress)
     display_text = text[:chars_to_show]
@@ -190,89 +165,281 @@ def draw_text(img: Image.Image, text: str, x: int, y: int, w: int, h: int, color
     else:
         # When complete: center the text within the allocated area
         text_x = x + (w - text_width) // 2
-        # Debug: print(f"Centering text: x={x}, w={w}, text_width={text_width}, centered_x={text_x}")
     
     # Always center vertically within the allocated area
     text_y = y + (h - text_height) // 2
     
+    return display_text, text_x, text_y
+
+def draw_text(img: Image.Image, text: str, x: int, y: int, w: int, h: int, color=(0,0,0,255), font_path=None, font_size=120, typing_progress=1.0):
+    """
+    Draw text with optional typewriter effect.
+    
+    Args:
+        typing_progress: 0.0 to 1.0, where 1.0 shows full text
+    """
+    draw = ImageDraw.Draw(img)
+    font = load_font(font_size, font_path)
+    display_text, text_x, text_y = layout_text(text, x, y, w, h, font, typing_progress)
     draw.text((text_x, text_y), display_text, font=font, fill=color)
 
+class TextSprite:
+    """
+    A text element rasterized once at its fitted size.
+    
+    The typewriter effect becomes a crop of the full-text mask at a cumulative
+    glyph advance plus a cursor bar, and settled text is a plain blit, so the
+    per-frame cost no longer depends on string length. Placement follows
+    layout_text: left-aligned while typing, centered once complete.
+    """
+    
+    def __init__(self, text: str, font):
+        self.text = text
+        self.left, self.top, right, bottom = font.getbbox(text)
+        self.width = right - self.left
+        self.height = bottom - self.top
+        self.mask = Image.new("L", (max(1, self.width), max(1, self.height)), 0)
+        ImageDraw.Draw(self.mask).text((-self.left, -self.top), text, font=font, fill=255)
+        
+        self.cursor_left, self.cursor_top, right, bottom = font.getbbox("|")
+        self.cursor = Image.new("L", (max(1, right - self.cursor_left), max(1, bottom - self.cursor_top)), 0)
+        ImageDraw.Draw(self.cursor).text((-self.cursor_left, -self.cursor_top), "|", font=font, fill=255)
+        
+        # Pen position after each prefix, and the height layout_text centers on
+        # while that prefix is shown with the cursor
+        self.advances = [round(font.getlength(text[:i])) for i in range(len(text) + 1)]
+        self.typing_heights = []
+        for i in range(len(text) + 1):
+            bbox = font.getbbox(text[:i] + "|")
+            self.typing_heights.append(bbox[3] - bbox[1])
+        
+        # Mask columns showing each prefix: up to its ink's right edge, but
+        # never into the ink of a glyph still to be typed (a "j" reaches back
+        # under its predecessor), so untyped glyphs leave no trace
+        next_ink = [self.width + self.left] * (len(text) + 1)
+        for i in range(len(text) - 1, -1, -1):
+            left, _, right, _ = font.getbbox(text[i])
+            ink = self.advances[i] + left if right > left else next_ink[i + 1]
+            next_ink[i] = min(ink, next_ink[i + 1])
+        self.crops = [0]
+        for i in range(1, len(text) + 1):
+            right = font.getbbox(text[:i])[2]
+            self.crops.append(max(0, min(right, next_ink[i], self.width + self.left) - self.left))
+    
+    def placements(self, x: int, y: int, w: int, h: int, typing_progress=1.0) -> list:
+        """
+        Masks to blit for the given allocated area and typing progress.
+        
+        Returns:
+            List of (mask, crop_width, left, top); crop_width is None when the
+            whole mask is shown, otherwise only its first crop_width columns
+        """
+        if typing_progress >= 1.0:
+            text_x = x + (w - self.width) // 2
+            text_y = y + (h - self.height) // 2
+            return [(self.mask, None, text_x + self.left, text_y + self.top)]
+        
+        chars_to_show = int(len(self.text) * typing_progress)
+        text_x = x
+        text_y = y + (h - self.typing_heights[chars_to_show]) // 2
+        
+        placements = []
+        crop_width = self.crops[chars_to_show]
+        if crop_width > 0:
+            placements.append((self.mask, crop_width, text_x + self.left, text_y + self.top))
+        placements.append((self.cursor, None,
+                           text_x + self.advances[chars_to_show] + self.cursor_left,
+                           text_y + self.cursor_top))
+        return placements
+
+@lru_cache(maxsize=256)
+def load_text_sprite(text: str, w: int, h: int) -> TextSprite:
+    """Text sprite at the font size that fits a w x h area, built once per process."""
+    return TextSprite(text, load_font(calculate_text_size(text, w, h)))
+
+# Draw-on reveal: seconds to sketch a sticker and resolution of its order field
+REVEAL_DURATION = 1.5
+REVEAL_FIELD_SIZE = 128
+
+def _geodesic_field(region: np.ndarray) -> np.ndarray:
+    """
+    Normalized geodesic distance (0-1) through a boolean region, 1.0 outside it.
+    
+    Uses repeated 4-neighbour dilation, seeding each disconnected part at its
+    first pixel in reading order so parts are drawn one after another.
+    """
+    distance = np.full(region.shape, -1, dtype=np.int32)
+    step = 0
+    while True:
+        unreached = region & (distance < 0)
+        if not unreached.any():
+            break
+        front = np.zeros_like(region)
+        front.flat[np.flatnonzero(unreached)[0]] = True
+        while front.any():
+            distance[front] = step
+            step += 1
+            grown = front.copy()
+            grown[1:] |= front[:-1]
+            grown[:-1] |= front[1:]
+            grown[:, 1:] |= front[:, :-1]
+            grown[:, :-1] |= front[:, 1:]
+            front = grown & region & (distance < 0)
+    return np.where(distance >= 0, distance / max(1, step - 1), 1.0).astype(np.float32)
+
+def reveal_order(img: Image.Image) -> np.ndarray:
+    """
+    Order in which the draw fx reveals a sticker's pixels, computed once at ingest.
+    
+    Dark outline pixels are traced first, by geodesic distance through the
+    strokes from the top-left-most one, like a marker following the lines;
+    colored fills follow behind, spreading through the sticker's shape. The
+    fields are computed at REVEAL_FIELD_SIZE and scaled up smoothly.
+    
+    Args:
+        img: Sticker at its final on-canvas size
+    
+    Returns:
+        (h, w) uint8 array; a pixel is visible once the reveal threshold exceeds it
+    """
+    rgba = np.asarray(img.convert("RGBA"))
+    opaque = rgba[..., 3] > 0
+    luminance = rgba[..., :3] @ np.array([0.299, 0.587, 0.114])
+    ink = opaque & (luminance < 100)
+    
+    h, w = opaque.shape
+    scale = max(1, -(-max(w, h) // REVEAL_FIELD_SIZE))
+    small_w, small_h = -(-w // scale), -(-h // scale)
+    
+    def field(mask):
+        padded = np.zeros((small_h * scale, small_w * scale), dtype=bool)
+        padded[:h, :w] = mask
+        small = _geodesic_field(padded.reshape(small_h, scale, small_w, scale).any(axis=(1, 3)))
+        return np.asarray(Image.fromarray(small, "F").resize((small_w * scale, small_h * scale), Image.BILINEAR))[:h, :w]
+    
+    if ink.any():
+        # Outlines occupy the first 60% of the reveal, fills the last 60%
+        order = np.where(ink, field(ink) * 0.6, 0.4 + field(opaque) * 0.6)
+    else:
+        order = field(opaque)
+    return np.clip(order * 255, 0, 255).astype(np.uint8)
+
+@lru_cache(maxsize=256)
+def load_reveal_order(prompt: str, width: int, height: int) -> np.ndarray:
+    """Reveal order for a prompt's sticker at width x height, built once per process."""
+    return reveal_order(gen_clipart(prompt).resize((width, height), Image.LANCZOS))
+
 def _ease_in_out(t):  # 0..1
     return 3*t*t - 2*t*t*t
 
-def composite_frame(t: float, storyboard: dict) -> Image.Image:
+def element_rect(el: Element) -> tuple:
+    """
+    Pixel rect (x, y, w, h) of an element on the grid.
+    
+    x is the horizontal center and y the top row, both as canvas fractions.
+    """
+    # Convert fractional coordinates to grid coordinates
+    # For centering: x=0.5 means center of element should be at 50% of canvas
+    grid_width = max(1, int(el.w * GRID_COLS))
+    grid_height = max(1, int(el.h * GRID_ROWS))
+    
+    # Calculate center position and convert to left edge
+    center_col = el.x * GRID_COLS
+    grid_col = int(center_col - grid_width / 2)
+    grid_row = int(el.y * GRID_ROWS)
+    
+    # Convert to pixel coordinates
+    return grid_to_pixels(grid_col, grid_row, grid_width, grid_height)
+
+# Entrance timings in seconds: fade in/out edge, slide_up travel, typewriter
+FADE_SECONDS = 0.5
+SLIDE_SECONDS = 0.6
+TYPING_SECONDS = 2.0
+
+def element_alpha(el: Element, t: float) -> float:
+    """Fade in/out alpha over FADE_SECONDS edges (clamped)."""
+    alpha = 1.0
+    edge = min(FADE_SECONDS, el.end - el.start)
+    if t < el.start + edge:
+        alpha = (t - el.start) / edge
+    if t > el.end - edge:
+        alpha = min(alpha, (el.end - t) / edge)
+    return max(0.0, min(1.0, alpha))
+
+def element_typing_progress(el: Element, t: float, alpha: float) -> float:
+    """Typewriter progress of a text element, including the fade."""
+    typing_duration = min(TYPING_SECONDS, el.end - el.start)
+    if t < el.start + typing_duration:
+        typing_progress = (t - el.start) / typing_duration
+    else:
+        typing_progress = 1.0  # Fully typed
+    
+    # Apply alpha to typing progress
+    return typing_progress * alpha
+
+def element_offset(el: Element, t: float) -> int:
+    """Vertical pixel offset from the slide_up effect."""
+    if el.fx is Fx.SLIDE_UP:
+        return int(40 * (1 - _ease_in_out(min(1.0, (t - el.start) / SLIDE_SECONDS))))
+    return 0
+
+def element_reveal(el: Element, t: float):
+    """
+    Reveal threshold (0-256) of the draw fx, or None once fully drawn or for other fx.
+    """
+    if el.fx is not Fx.DRAW:
+        return None
+    duration = min(REVEAL_DURATION, el.end - el.start)
+    if t >= el.start + duration:
+        return None
+    return max(0, int(256 * (t - el.start) / duration))
+
+def composite_frame(t: float, storyboard) -> Image.Image:
     """
     Render one RGB frame at time t (seconds) using grid-based layout.
-    Supports element.fx in {"fade","slide_up","none"}.
+    Supports element.fx in {"fade","slide_up","draw","none"}.
+    storyboard is a model.Storyboard or a storyboard dict.
     """
     canvas = new_canvas()
     
-    for el in storyboard["elements"]:
-        if not (el["start"] <= t <= el["end"]):
+    for el in Storyboard.coerce(storyboard).elements:
+        if not (el.start <= t <= el.end):
             continue
 
-        # Convert fractional coordinates to grid coordinates
-        # For centering: x=0.5 means center of element should be at 50% of canvas
-        grid_width = max(1, int(el["w"] * GRID_COLS))
-        grid_height = max(1, int(el["h"] * GRID_ROWS))
-        
-        # Calculate center position and convert to left edge
-        center_col = el["x"] * GRID_COLS
-        grid_col = int(center_col - grid_width / 2)
-        grid_row = int(el["y"] * GRID_ROWS)
-        
-        # Convert to pixel coordinates
-        x, y, w, h = grid_to_pixels(grid_col, grid_row, grid_width, grid_height)
-        
-        # Debug: print(f"Element '{el['content'][:20]}...': grid({grid_col},{grid_row}) size({grid_width}x{grid_height}) -> pixels({x},{y},{w},{h})")
-
-        # compute fade in/out alpha over 0.5s edges (clamped)
-        alpha = 1.0
-        edge = min(0.5, el["end"] - el["start"])
-        if t < el["start"] + edge:
-            alpha = (t - el["start"]) / edge
-        if t > el["end"] - edge:
-            alpha = min(alpha, (el["end"] - t) / edge)
-        alpha = max(0.0, min(1.0, alpha))
-
-        if el["type"] == "text":
-            # Calculate optimal font size for the allocated space
-            font_size = calculate_text_size(el["content"], w, h)
-            # Debug: print(f"  Text font size: {font_size}px for '{el['content']}' in {w}x{h}px area")
-            
-            # Calculate typing progress for typewriter effect
-            typing_duration = min(2.0, el["end"] - el["start"])  # Max 2 seconds for typing
-            if t < el["start"] + typing_duration:
-                typing_progress = (t - el["start"]) / typing_duration
-            else:
-                typing_progress = 1.0  # Fully typed
-            
-            # Apply alpha to typing progress
-            typing_progress *= alpha
+        x, y, w, h = element_rect(el)
+        alpha = element_alpha(el, t)
+
+        if el.type is ElementType.TEXT:
+            # Rasterized once at the optimal font size for the allocated space
+            sprite = load_text_sprite(el.content, w, h)
+            color = (0, 0, 0, int(255*alpha))
             
-            draw_text(canvas, el["content"], x, y, w, h,
-                     color=(0,0,0,int(255*alpha)), 
-                     font_size=font_size, 
-                     typing_progress=typing_progress)
+            for mask, crop_width, left, top in sprite.placements(x, y, w, h, element_typing_progress(el, t, alpha)):
+                if crop_width is not None:
+                    mask = mask.crop((0, 0, crop_width, mask.height))
+                canvas.paste(color, (left, top), mask)
         else:
             # image
-            prompt = el["content"]
+            prompt = el.content
             
             # Calculate optimal image size for the allocated space
             img_w, img_h = calculate_image_size(prompt, w, h)
-            # Debug: print(f"  Image size: {img_w}x{img_h}px for '{prompt}' in {w}x{h}px area")
             
             img = gen_clipart(prompt)
             img = img.resize((img_w, img_h), Image.LANCZOS)
 
-            if el["fx"] == "slide_up":
-                amt = int(40 * (1 - _ease_in_out(min(1.0, (t - el["start"]) / 0.6))))
-                y += amt
+            y += element_offset(el, t)
 
             if alpha < 1:
                 a = img.getchannel("A").point(lambda p: int(p * alpha))
                 img.putalpha(a)
 
+            reveal = element_reveal(el, t)
+            if reveal is not None:
+                order = load_reveal_order(prompt, img_w, img_h)
+                a = np.where(order < reveal, np.asarray(img.getchannel("A")), 0).astype(np.uint8)
+                img.putalpha(Image.fromarray(a))
+
             canvas.alpha_composite(img, (x, y))
     
     return canvas.convert("RGB")
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Long-lived render daemon with warm caches and a local job API.
+
+Imports, fonts, prepared sprites, generated storyboards and API clients stay
+in memory between jobs, so a job for an already-seen storyboard costs little
+more than the render itself. Jobs are queued and run by a pool of worker
+threads.
+
+API (JSON over HTTP, bound to localhost):
+    POST   /jobs        {"narration": "...", "duration": 8.0} or {"storyboard": {...}}
+                        optional: "output", "fps", "audio_path", "backend",
+                        "renditions" (e.g. ["1080p", "720p", "480p"]), "preview_dir",
+                        "preview_only"
+    GET    /jobs        list jobs
+    GET    /jobs/<id>   job status, with frames done, fps, ETA and cache stats while running
+    DELETE /jobs/<id>   cancel a queued or running job
+    GET    /health      worker and queue summary
+
+Usage: python server.py [--port 8765] [--workers 2] [--output-dir renders]
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import logging
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from dotenv import load_dotenv
+from storyboard import build_storyboard
+from video import parts_dir, render_video, RenderCancelled
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Storyboards generated for distinct (narration, duration) pairs kept in memory
+STORYBOARD_CACHE_SIZE = 256
+
+# Finished jobs stay queryable for this many seconds, and at most this many
+FINISHED_JOB_TTL = float(os.getenv("RENDER_JOB_TTL", 3600))
+MAX_FINISHED_JOBS = 1000
+
+FINISHED = ("done", "failed", "cancelled")
+
+class Job:
+    """One render request and its lifecycle."""
+
+    def __init__(self, spec: dict, output_path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.spec = spec
+        self.output_path = output_path
+        self.outputs = None  # rendition name -> path for multi-rendition jobs
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.error = None
+        self.progress = None  # latest video.ProgressEvent while running
+        self.cancel = threading.Event()
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "output": self.output_path,
+            "outputs": self.outputs,
+            "error": self.error,
+            "progress": self.progress.to_dict() if self.progress else None,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+            "render_seconds": (self.finished - self.started) if self.started and self.finished else None,
+        }
+
+class RenderService:
+    """
+    Job queue plus worker threads sharing one process's warm caches.
+    """
+
+    def __init__(self, workers: int = 2, output_dir: str = "renders", backend: str = None):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(exist_ok=True)
+        self.backend = backend or os.getenv("RENDER_BACKEND", "numpy")
+        self.jobs = {}
+        self.queue = queue.Queue()
+        self.lock = threading.Lock()
+        self.storyboards = OrderedDict()
+        self.threads = [threading.Thread(target=self._worker, name=f"render-{i}", daemon=True)
+                        for i in range(workers)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, spec: dict) -> Job:
+        """
+        Queue a job.
+
+        Args:
+            spec: Either "storyboard" (dict) or "narration" (str, with optional
+                  "duration"), plus optional "output", "fps", "audio_path", "backend",
+                  "renditions", "preview_dir", "preview_only"
+
+        Returns:
+            The queued Job
+        """
+        if "storyboard" not in spec and "narration" not in spec:
+            raise ValueError("Job needs a 'storyboard' or a 'narration'")
+        job = Job(spec, "")
+        job.output_path = spec.get("output") or str(self.output_dir / f"{job.id}.mp4")
+        with self.lock:
+            self._prune_jobs()
+            self.jobs[job.id] = job
+        self.queue.put(job)
+        return job
+
+    def _prune_jobs(self):
+        """Forget finished jobs past FINISHED_JOB_TTL or beyond MAX_FINISHED_JOBS. Call under lock."""
+        cutoff = time.time() - FINISHED_JOB_TTL
+        finished = sorted((job for job in self.jobs.values() if job.status in FINISHED and job.finished),
+                          key=lambda job: job.finished)
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for i, job in enumerate(finished):
+            if i < excess or job.finished < cutoff:
+                del self.jobs[job.id]
+
+    def cancel(self, job_id: str) -> Job:
+        with self.lock:
+            job = self.jobs[job_id]
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished = time.time()
+        job.cancel.set()
+        return job
+
+    def get_storyboard(self, narration: str, duration: float = None) -> dict:
+        """Storyboard for a narration, generated once and then served from memory."""
+        key = hashlib.sha256(json.dumps([narration, duration]).encode()).hexdigest()
+        with self.lock:
+            if key in self.storyboards:
+                self.storyboards.move_to_end(key)
+                return copy.deepcopy(self.storyboards[key])
+
+        sb = build_storyboard(narration, duration)
+
+        with self.lock:
+            self.storyboards[key] = sb
+            while len(self.storyboards) > STORYBOARD_CACHE_SIZE:
+                self.storyboards.popitem(last=False)
+        return copy.deepcopy(sb)
+
+    def _worker(self):
+        while True:
+            job = self.queue.get()
+            try:
+                self._run(job)
+            finally:
+                self.queue.task_done()
+
+    def _run(self, job: Job):
+        with self.lock:
+            if job.status == "cancelled":
+                return
+            job.status = "running"
+            job.started = time.time()
+
+        spec = job.spec
+        try:
+            duration = spec.get("duration")
+            if "storyboard" in spec:
+                sb = copy.deepcopy(spec["storyboard"])
+            else:
+                sb = self.get_storyboard(spec["narration"], duration)
+
+            outputs = render_video(sb, output_path=job.output_path, fps=int(spec.get("fps", 30)),
+                                   audio_path=spec.get("audio_path"), target_duration=duration,
+                                   backend=spec.get("backend", self.backend), cancel=job.cancel,
+                                   renditions=spec.get("renditions"),
+                                   preview_dir=spec.get("preview_dir"),
+                                   preview_only=bool(spec.get("preview_only")),
+                                   progress=lambda event: setattr(job, "progress", event))
+            status, error = "done", None
+        except RenderCancelled:
+            status, error = "cancelled", None
+        except Exception as e:
+            status, error = "failed", str(e)
+            logger.error("❌ Job %s failed: %s", job.id, e)
+
+        # Chunks under a generated name can't be resumed by a later job
+        if status != "done" and not spec.get("output"):
+            shutil.rmtree(parts_dir(job.output_path), ignore_errors=True)
+
+        with self.lock:
+            job.status = status
+            job.error = error
+            if status == "done":
+                job.outputs = outputs
+            job.finished = time.time()
+
+    def summary(self) -> dict:
+        with self.lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "workers": len(self.threads),
+            "backend": self.backend,
+            "jobs": counts,
+            "cached_storyboards": len(self.storyboards),
+        }
+
+def make_handler(service: RenderService):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _job_id(self):
+            parts = self.path.strip("/").split("/")
+            return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+        def do_GET(self):
+            if self.path == "/health":
+                return self._send(200, service.summary())
+            if self.path.rstrip("/") == "/jobs":
+                with service.lock:
+                    jobs = [job.to_dict() for job in service.jobs.values()]
+                return self._send(200, {"jobs": jobs})
+            job = service.jobs.get(self._job_id())
+            if job is None:
+                return self._send(404, {"error": "not found"})
+            return self._send(200, job.to_dict())
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self._send(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                spec = json.loads(self.rfile.read(length) or b"{}")
+                job = service.submit(spec)
+            except (ValueError, TypeError) as e:
+                return self._send(400, {"error": str(e)})
+            return self._send(202, job.to_dict())
+
+        def do_DELETE(self):
+            try:
+                job = service.cancel(self._job_id())
+            except KeyError:
+                return self._send(404, {"error": "not found"})
+            return self._send(200, job.to_dict())
+
+        def log_message(self, format, *args):
+            pass  # keep the daemon's output to job events
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Whiteboard render daemon")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("RENDER_PORT", 8765)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("RENDER_WORKERS", 2)))
+    parser.add_argument("--output-dir", default="renders")
+    parser.add_argument("--backend", default=None, help="pil or numpy (default: RENDER_BACKEND or numpy)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    service = RenderService(workers=args.workers, output_dir=args.output_dir, backend=args.backend)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🎬 Render daemon on http://{args.host}:{args.port} with {args.workers} workers ({service.backend} backend)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
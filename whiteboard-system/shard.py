@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Render one storyboard across several machines by frame range.
+
+Every host mounts the same working directory (output path, .parts directory
+and sticker cache). Prefetch the stickers once, start one shard per host, then
+merge. Shards use the bundled font and only read cached stickers, so a chunk
+is pixel-identical whichever host rendered it, and the merge is a lossless
+stream copy.
+
+Usage:
+    python shard.py prefetch storyboard.json
+    python shard.py render storyboard.json --index 0 --count 4 --output scene.mp4
+    python shard.py merge storyboard.json --count 4 --output scene.mp4 [--audio narration.m4a]
+"""
+
+import argparse
+import logging
+from pathlib import Path
+from dotenv import load_dotenv
+from model import Storyboard, ElementType
+from stickers import prefetch_stickers
+from video import render_video, merge_shards, log_progress
+
+load_dotenv()
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded rendering over a shared filesystem")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    prefetch = sub.add_parser("prefetch", help="Generate and cache every sticker the storyboard needs")
+    prefetch.add_argument("storyboard")
+
+    for name, help_text in (("render", "Render one shard's chunks"), ("merge", "Join all shards' chunks")):
+        cmd = sub.add_parser(name, help=help_text)
+        cmd.add_argument("storyboard")
+        cmd.add_argument("--count", type=int, required=True, help="Total number of shards")
+        cmd.add_argument("--output", default="scene.mp4")
+        cmd.add_argument("--fps", type=int, default=30)
+        cmd.add_argument("--duration", type=float, default=None)
+        cmd.add_argument("--backend", default=None, help="pil or numpy (must match across shards)")
+        cmd.add_argument("--renditions", nargs="*", default=None)
+        if name == "render":
+            cmd.add_argument("--index", type=int, required=True, help="This shard, 0 to count-1")
+        else:
+            cmd.add_argument("--audio", default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    sb = Storyboard.from_json(Path(args.storyboard).read_bytes())
+    if args.command == "prefetch":
+        prefetch_stickers([el.content for el in sb.elements if el.type is ElementType.IMAGE])
+    elif args.command == "render":
+        render_video(sb, output_path=args.output, fps=args.fps, target_duration=args.duration,
+                     backend=args.backend, renditions=args.renditions, shard=(args.index, args.count), progress=log_progress)
+    else:
+        merge_shards(sb, output_path=args.output, shard_count=args.count, fps=args.fps, audio_path=args.audio,
+                     target_duration=args.duration, backend=args.backend, renditions=args.renditions)
+
+if __name__ == "__main__":
+    main()
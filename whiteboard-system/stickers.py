@@ -5,13 +5,263 @@ Generates PNG stickers with proper alpha channels for white-canvas videos.
 """
 
 import base64
+import hashlib
 import io
+import json
+import logging
+import re
+import threading
+from collections import Counter
 from PIL import Image
 from openai import OpenAI
 import os
 from pathlib import Path
 
 client = OpenAI()
+logger = logging.getLogger(__name__)
+
+# Words dropped from prompts before keying the cache
+ARTICLES = {"a", "an", "the"}
+
+# Style prefixes generate_sticker adds itself; storyboards often repeat them
+STYLE_PREFIXES = ["whiteboard illustration", "cute cartoon", "clip art"]
+
+# Minimum prompt_similarity for reusing a cached sticker of a different prompt
+DEFAULT_MATCH_THRESHOLD = 0.8
+
+INDEX_FILE = "index.json"
+
+# Per-process lookup counters, see cache_stats()
+_stats = Counter()
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Canonical form of a sticker prompt used for cache keys.
+    
+    Lowercases, replaces punctuation with spaces, drops articles and a leading
+    style prefix (including the current STICKER_STYLE), and collapses whitespace,
+    so "A simple vaccine vial." and "simple  vaccine vial" share one sticker.
+    
+    Args:
+        prompt: Raw image description from the storyboard
+    
+    Returns:
+        Normalized prompt string
+    """
+    words = re.sub(r"[^\w\s]|_", " ", prompt.lower()).split()
+    words = [w for w in words if w not in ARTICLES]
+    
+    prefixes = list(STYLE_PREFIXES)
+    style = os.getenv("STICKER_STYLE", "").strip().lower()
+    if style and style not in prefixes:
+        prefixes.insert(0, style)
+    
+    for prefix in prefixes:
+        prefix_words = prefix.split()
+        if words[:len(prefix_words)] == prefix_words and len(words) > len(prefix_words):
+            words = words[len(prefix_words):]
+            break
+    
+    return " ".join(words)
+
+def prompt_ngrams(normalized: str) -> set:
+    """Token unigrams and bigrams of a normalized prompt."""
+    tokens = normalized.split()
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+def prompt_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two normalized prompts for sticker reuse.
+    
+    Only prompts that differ by added words are comparable: unless one
+    prompt's tokens are a subset of the other's the similarity is 0, since a
+    swapped word ("doctor"/"nurse", "red"/"green", "3"/"5") changes what is
+    drawn. Otherwise it is the fraction of the shorter prompt's n-grams found
+    in the longer one, which drops below 1 when the shared words are reordered.
+    
+    Args:
+        a: Normalized prompt
+        b: Normalized prompt
+    
+    Returns:
+        Similarity between 0 and 1
+    """
+    tokens_a, tokens_b = set(a.split()), set(b.split())
+    if not tokens_a or not tokens_b or not (tokens_a <= tokens_b or tokens_b <= tokens_a):
+        return 0.0
+    grams_a, grams_b = prompt_ngrams(a), prompt_ngrams(b)
+    return len(grams_a & grams_b) / min(len(grams_a), len(grams_b))
+
+def _cache_key(text: str, size: str) -> str:
+    return hashlib.sha256(f"{text}_{size}".encode()).hexdigest()[:16]
+
+class StickerIndex:
+    """
+    Similarity index over the normalized prompts of cached stickers.
+    
+    Persisted as index.json inside the cache directory. An inverted index from
+    n-gram to cache keys keeps lookups proportional to the number of stickers
+    that share a token with the query rather than the whole cache.
+    """
+    
+    def __init__(self, cache_path: Path):
+        self.path = cache_path / INDEX_FILE
+        self.entries = {}  # cache key -> {"prompt": normalized, "size": size}
+        self.postings = {}  # n-gram -> set of cache keys
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self.entries = {}
+        for key, entry in self.entries.items():
+            self._post(key, entry["prompt"])
+    
+    def _post(self, key: str, normalized: str):
+        for gram in prompt_ngrams(normalized):
+            self.postings.setdefault(gram, set()).add(key)
+    
+    def add(self, key: str, normalized: str, size: str):
+        with _index_lock:
+            if key in self.entries:
+                return
+            self.entries[key] = {"prompt": normalized, "size": size}
+            self._post(key, normalized)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True))
+            tmp.replace(self.path)
+    
+    def best_match(self, normalized: str, size: str, threshold: float) -> tuple:
+        """
+        Find the most similar cached prompt of the same size.
+        
+        Returns:
+            (cache key, similarity) or (None, 0.0) if nothing reaches threshold
+        """
+        candidates = set()
+        with _index_lock:
+            for gram in prompt_ngrams(normalized):
+                candidates |= self.postings.get(gram, set())
+        
+        grams = prompt_ngrams(normalized)
+        best_key, best_score, best_extra = None, 0.0, 0
+        for key in sorted(candidates):
+            entry = self.entries[key]
+            if entry["size"] != size:
+                continue
+            score = prompt_similarity(normalized, entry["prompt"])
+            # Among equally similar prompts prefer the one with the fewest added words
+            extra = len(grams ^ prompt_ngrams(entry["prompt"]))
+            if score > best_score or (score == best_score and extra < best_extra):
+                best_key, best_score, best_extra = key, score, extra
+        
+        if best_score >= threshold:
+            return best_key, best_score
+        return None, 0.0
+
+_indexes = {}
+_index_lock = threading.RLock()  # render workers share indexes and index.json
+
+def _get_index(cache_path: Path) -> StickerIndex:
+    key = str(cache_path.resolve())
+    with _index_lock:
+        if key not in _indexes:
+            _indexes[key] = StickerIndex(cache_path)
+        return _indexes[key]
+
+def _match_threshold(threshold: float = None) -> float:
+    if threshold is not None:
+        return threshold
+    return float(os.getenv("STICKER_MATCH_THRESHOLD", DEFAULT_MATCH_THRESHOLD))
+
+def lookup_sticker(prompt: str, size: str = "1024x1024", cache_dir: str = ".cache_stickers", threshold: float = None) -> tuple:
+    """
+    Resolve a prompt against the sticker cache without generating anything.
+    
+    Tries the normalized key, then the legacy raw-prompt key, then the
+    n-gram similarity index.
+    
+    Args:
+        prompt: Description of what to draw
+        size: Image size
+        cache_dir: Directory holding cached stickers
+        threshold: Minimum similarity for a fuzzy hit (default: STICKER_MATCH_THRESHOLD or 0.8)
+    
+    Returns:
+        (cache file, kind) where kind is "exact", "fuzzy" or "miss";
+        cache file is where a newly generated sticker belongs on a miss
+    """
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(exist_ok=True)
+    index = _get_index(cache_path)
+    
+    normalized = normalize_prompt(prompt)
+    key = _cache_key(normalized, size)
+    cache_file = cache_path / f"{key}.png"
+    if cache_file.exists():
+        index.add(key, normalized, size)
+        return cache_file, "exact"
+    
+    # Stickers cached before prompts were normalized
+    legacy_file = cache_path / f"{_cache_key(prompt, size)}.png"
+    if legacy_file.exists():
+        index.add(legacy_file.stem, normalized, size)
+        return legacy_file, "exact"
+    
+    match_key, _ = index.best_match(normalized, size, _match_threshold(threshold))
+    if match_key is not None:
+        match_file = cache_path / f"{match_key}.png"
+        if match_file.exists():
+            return match_file, "fuzzy"
+    
+    return cache_file, "miss"
+
+def cache_stats() -> dict:
+    """Sticker cache lookup counters since the last reset_cache_stats()."""
+    lookups = sum(_stats.values())
+    hits = _stats["exact"] + _stats["fuzzy"]
+    return {
+        "lookups": lookups,
+        "exact": _stats["exact"],
+        "fuzzy": _stats["fuzzy"],
+        "miss": _stats["miss"],
+        "hit_rate": hits / lookups if lookups else 0.0,
+    }
+
+def reset_cache_stats():
+    _stats.clear()
+
+def prefetch_stickers(prompts: list, size: str = "1024x1024", cache_dir: str = ".cache_stickers") -> dict:
+    """
+    Resolve a batch of prompts up front, generating any misses, and report hit rate.
+    
+    Args:
+        prompts: Image descriptions, typically every image element of a storyboard
+        size: Image size
+        cache_dir: Directory holding cached stickers
+    
+    Returns:
+        Dict with lookups, exact, fuzzy, miss and hit_rate for this batch
+    """
+    batch = Counter()
+    for prompt in dict.fromkeys(prompts):
+        _, kind = lookup_sticker(prompt, size, cache_dir)
+        batch[kind] += 1
+        if kind == "miss":
+            generate_sticker(prompt, size, cache_dir)
+    
+    lookups = sum(batch.values())
+    hits = batch["exact"] + batch["fuzzy"]
+    hit_rate = hits / lookups if lookups else 0.0
+    logger.info("📊 Sticker cache: %d/%d hits (%d exact, %d fuzzy), %d generated, hit rate %.0f%%",
+                hits, lookups, batch["exact"], batch["fuzzy"], batch["miss"], hit_rate * 100)
+    
+    return {
+        "lookups": lookups,
+        "exact": batch["exact"],
+        "fuzzy": batch["fuzzy"],
+        "miss": batch["miss"],
+        "hit_rate": hit_rate,
+    }
 
 def remove_white_background(img: Image.Image, tolerance: int = 16) -> Image.Image:
     """
@@ -41,7 +291,7 @@ def remove_white_background(img: Image.Image, tolerance: int = 16) -> Image.Imag
                 px[x, y] = (r, g, b, 0)  # Make transparent
                 transparent_count += 1
     
-    print(f"🎯 Made {transparent_count} pixels transparent (tolerance: {tolerance})")
+    logger.debug("🎯 Made %d pixels transparent (tolerance: %d)", transparent_count, tolerance)
     return img
 
 def detect_and_remove_background(img: Image.Image) -> Image.Image:
@@ -75,7 +325,7 @@ def detect_and_remove_background(img: Image.Image) -> Image.Image:
     corner_colors = Counter(corner_pixels)
     background_color = corner_colors.most_common(1)[0][0]
     
-    print(f"🔍 Detected background color: RGB{background_color[:3]}")
+    logger.debug("🔍 Detected background color: RGB%s", background_color[:3])
     
     # Remove background with adaptive tolerance
     px = img.load()
@@ -93,7 +343,7 @@ def detect_and_remove_background(img: Image.Image) -> Image.Image:
     else:  # Darker background
         tolerance = 40
     
-    print(f"🎯 Using adaptive tolerance: {tolerance}")
+    logger.debug("🎯 Using adaptive tolerance: %d", tolerance)
     
     for y in range(H):
         for x in range(W):
@@ -105,31 +355,31 @@ def detect_and_remove_background(img: Image.Image) -> Image.Image:
                 px[x, y] = (r, g, b, 0)  # Make transparent
                 transparent_count += 1
     
-    print(f"🎯 Made {transparent_count} pixels transparent (background: RGB{bg_r},{bg_g},{bg_b})")
+    logger.debug("🎯 Made %d pixels transparent (background: RGB%d,%d,%d)", transparent_count, bg_r, bg_g, bg_b)
     return img
 
-def generate_sticker(prompt: str, size: str = "1024x1024", cache_dir: str = ".cache_stickers") -> Image.Image:
+def generate_sticker(prompt: str, size: str = "1024x1024", cache_dir: str = ".cache_stickers", threshold: float = None) -> Image.Image:
     """
     Generate a true transparent PNG sticker using OpenAI Images API.
     
+    Prompts are normalized before keying the cache, and a cached sticker whose
+    prompt is similar enough (see lookup_sticker) is reused instead of generating.
+    
     Args:
         prompt: Description of what to draw (e.g., "cute cartoon cat")
         size: Image size (default: "1024x1024")
         cache_dir: Directory to cache generated stickers
+        threshold: Minimum similarity for reusing a different cached prompt
     
     Returns:
         PIL Image with RGBA mode and transparent background
     """
-    cache_path = Path(cache_dir)
-    cache_path.mkdir(exist_ok=True)
+    cache_file, kind = lookup_sticker(prompt, size, cache_dir, threshold)
+    _stats[kind] += 1
     
-    # Create cache filename based on prompt
-    import hashlib
-    cache_key = hashlib.sha256(f"{prompt}_{size}".encode()).hexdigest()[:16]
-    cache_file = cache_path / f"{cache_key}.png"
-    
-    if cache_file.exists():
-        print(f"📁 Using cached sticker: {prompt}")
+    if kind != "miss":
+        # Called for every image on every frame by the PIL backend, so keep it quiet
+        logger.debug("📁 Using cached sticker: %s%s", prompt, " (similar prompt)" if kind == "fuzzy" else "")
         return Image.open(cache_file).convert("RGBA")
     
     # Choose style prefix from env or default
@@ -152,13 +402,13 @@ def generate_sticker(prompt: str, size: str = "1024x1024", cache_dir: str = ".ca
             "Bold clean outline, no white border."
         )
     
-    print(f"🎨 Generating sticker: {prompt}")
+    logger.info("🎨 Generating sticker: %s", prompt)
     
     try:
         # Use DALL-E 3 with optimized transparency prompt
         # Note: gpt-image-1 requires organization verification
         # When available, use: model="gpt-image-1", background="transparent", output_format="png"
-        print("🎨 Using DALL-E 3 with optimized transparency prompt")
+        logger.debug("🎨 Using DALL-E 3 with optimized transparency prompt")
         response = client.images.generate(
             model="dall-e-3",
             prompt=sticker_prompt,
@@ -173,7 +423,7 @@ def generate_sticker(prompt: str, size: str = "1024x1024", cache_dir: str = ".ca
         img = Image.open(io.BytesIO(img_data)).convert("RGBA")
         
         # Post-process: Intelligently detect and remove background
-        print("🔧 Post-processing: Detecting and removing background...")
+        logger.debug("🔧 Post-processing: Detecting and removing background...")
         img = detect_and_remove_background(img)
         
         # Verify transparency after post-processing
@@ -181,20 +431,21 @@ def generate_sticker(prompt: str, size: str = "1024x1024", cache_dir: str = ".ca
             alpha_channel = img.getchannel("A")
             min_alpha, max_alpha = alpha_channel.getextrema()
             if min_alpha < 255:
-                print(f"✓ Generated transparent sticker (alpha: {min_alpha}-{max_alpha})")
+                logger.debug("✓ Generated transparent sticker (alpha: %d-%d)", min_alpha, max_alpha)
             else:
-                print(f"⚠️  Warning: Image may not be fully transparent")
+                logger.warning("⚠️  Image may not be fully transparent: %s", prompt)
         except Exception as e:
-            print(f"⚠️  Could not verify transparency: {e}")
+            logger.warning("⚠️  Could not verify transparency: %s", e)
         
         # Save to cache
         img.save(cache_file, format="PNG")
-        print(f"💾 Cached sticker: {cache_file}")
+        _get_index(cache_file.parent).add(cache_file.stem, normalize_prompt(prompt), size)
+        logger.info("💾 Cached sticker: %s", cache_file)
         
         return img
         
     except Exception as e:
-        print(f"❌ Error generating sticker '{prompt}': {e}")
+        logger.error("❌ Error generating sticker '%s': %s", prompt, e)
         # Return a transparent placeholder
         placeholder = Image.new("RGBA", (1024, 1024), (0, 0, 0, 0))
         return placeholder
@@ -216,4 +467,5 @@ def test_sticker_generation():
     print("✅ Sticker generation test complete!")
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     test_sticker_generation()
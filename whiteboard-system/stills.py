@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Still frames and contact sheets without the video pipeline.
+Renders chosen timestamps, or keyframes picked from element start / settle /
+end boundaries, straight to PNG or WebP through the same compositors and
+sprite caches render_video uses. Never imports moviepy, so a thumbnail of an
+already-prepared storyboard costs one composite.
+
+Usage: python stills.py storyboard.json [--times 1.0 2.5] [--out-dir stills] [--sheet sheet.png]
+"""
+
+import argparse
+from pathlib import Path
+from PIL import Image, ImageDraw
+from renderer import (
+    W, H, composite_frame, load_font, element_alpha, element_offset, element_reveal,
+    FADE_SECONDS, SLIDE_SECONDS, TYPING_SECONDS, REVEAL_DURATION,
+)
+from compositor import composite_frame_np
+from model import Storyboard, ElementType, Fx
+
+SHEET_PADDING = 12
+SHEET_LABEL_HEIGHT = 28
+
+def render_still(storyboard, t: float, backend: str = "numpy") -> Image.Image:
+    """
+    Render the frame at time t as an RGB image.
+
+    Args:
+        storyboard: Storyboard or storyboard dict
+        t: Time in seconds
+        backend: "numpy" (prepared-sprite cache, fastest) or "pil"
+    """
+    if backend == "pil":
+        return composite_frame(t, storyboard)
+    return Image.fromarray(composite_frame_np(t, storyboard))
+
+def settle_time(el) -> float:
+    """When an element's entrance (fade, slide, draw, typing) has finished."""
+    edge = min(FADE_SECONDS, el.end - el.start)
+    entrance = FADE_SECONDS
+    if el.fx is Fx.SLIDE_UP:
+        entrance = max(entrance, SLIDE_SECONDS)
+    if el.fx is Fx.DRAW:
+        entrance = max(entrance, REVEAL_DURATION)
+    if el.type is ElementType.TEXT:
+        entrance = max(entrance, TYPING_SECONDS)
+    # Short elements start fading out before their entrance completes
+    return max(el.start, min(el.start + entrance, el.end - edge))
+
+def keyframe_times(storyboard) -> list:
+    """
+    Sorted, de-duplicated start, settle and end times of every element,
+    clamped to the scene.
+    """
+    storyboard = Storyboard.coerce(storyboard)
+    duration = storyboard.scene_duration
+    times = set()
+    for el in storyboard.elements:
+        for t in (el.start, settle_time(el), el.end):
+            times.add(round(min(max(float(t), 0.0), duration), 3))
+    return sorted(times)
+
+def _settled_count(storyboard: Storyboard, t: float) -> int:
+    return sum(1 for el in storyboard.elements
+               if el.start <= t <= el.end and element_alpha(el, t) >= 1
+               and element_offset(el, t) == 0 and element_reveal(el, t) is None)
+
+def final_layout_time(storyboard) -> float:
+    """
+    Latest time at which the most elements are fully on screen at once, the
+    thumbnail that best shows the finished layout.
+    """
+    storyboard = Storyboard.coerce(storyboard)
+    candidates = [settle_time(el) for el in storyboard.elements] or [0.0]
+    return max(candidates, key=lambda t: (_settled_count(storyboard, t), t))
+
+def save_still(image: Image.Image, path: str, quality: int = 90) -> str:
+    """Write an image as PNG or WebP, chosen by the file suffix."""
+    path = Path(path)
+    if path.suffix.lower() == ".webp":
+        image.save(path, "WEBP", quality=quality, method=4)
+    else:
+        image.save(path, "PNG")
+    return str(path)
+
+def _thumbnail(image: Image.Image, width: int) -> Image.Image:
+    if width >= image.width:
+        return image
+    # Integer reduce first (cheap box filter), then an exact resize
+    factor = image.width // width
+    if factor > 1:
+        image = image.reduce(factor)
+    height = round(width * H / W)
+    return image.resize((width, height), Image.BILINEAR) if image.width != width else image
+
+def render_stills(storyboard, times: list = None, out_dir: str = "stills", fmt: str = "png",
+                  width: int = W, backend: str = "numpy") -> list:
+    """
+    Render timestamps (default: keyframe_times) to image files.
+
+    Args:
+        storyboard: Storyboard or storyboard dict
+        times: Times in seconds, or None for keyframes
+        out_dir: Directory for the files, created if needed
+        fmt: "png" or "webp"
+        width: Output width; smaller values give thumbnails
+        backend: "numpy" or "pil"
+
+    Returns:
+        List of written file paths, in the order of times
+    """
+    storyboard = Storyboard.coerce(storyboard)
+    if times is None:
+        times = keyframe_times(storyboard)
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for t in times:
+        image = _thumbnail(render_still(storyboard, t, backend), width)
+        paths.append(save_still(image, out / f"still_{t:08.3f}.{fmt}"))
+    return paths
+
+def contact_sheet(storyboard, times: list = None, columns: int = 4, thumb_width: int = 320,
+                  backend: str = "numpy") -> Image.Image:
+    """
+    Grid of labelled thumbnails for scrubbing.
+
+    Args:
+        storyboard: Storyboard or storyboard dict
+        times: Times in seconds, or None for keyframes
+        columns: Thumbnails per row
+        thumb_width: Width of each thumbnail in pixels
+        backend: "numpy" or "pil"
+
+    Returns:
+        RGB image of the sheet
+    """
+    storyboard = Storyboard.coerce(storyboard)
+    if times is None:
+        times = keyframe_times(storyboard)
+    thumb_height = round(thumb_width * H / W)
+    rows = max(1, -(-len(times) // columns))
+    cell_w = thumb_width + SHEET_PADDING
+    cell_h = thumb_height + SHEET_LABEL_HEIGHT + SHEET_PADDING
+    sheet = Image.new("RGB", (columns * cell_w + SHEET_PADDING, rows * cell_h + SHEET_PADDING), (230, 230, 230))
+    draw = ImageDraw.Draw(sheet)
+    font = load_font(18)
+
+    for i, t in enumerate(times):
+        left = SHEET_PADDING + (i % columns) * cell_w
+        top = SHEET_PADDING + (i // columns) * cell_h
+        sheet.paste(_thumbnail(render_still(storyboard, t, backend), thumb_width), (left, top))
+        draw.text((left, top + thumb_height + 4), f"{t:.2f}s", fill=(0, 0, 0), font=font)
+    return sheet
+
+def main():
+    parser = argparse.ArgumentParser(description="Render still frames and contact sheets")
+    parser.add_argument("storyboard", help="Storyboard JSON file")
+    parser.add_argument("--times", type=float, nargs="*", default=None,
+                        help="Timestamps in seconds (default: element keyframes)")
+    parser.add_argument("--final", action="store_true", help="Only the settled final layout")
+    parser.add_argument("--out-dir", default="stills")
+    parser.add_argument("--format", choices=("png", "webp"), default="png")
+    parser.add_argument("--width", type=int, default=W)
+    parser.add_argument("--sheet", default=None, help="Also write a contact sheet to this path")
+    parser.add_argument("--backend", default="numpy")
+    args = parser.parse_args()
+
+    sb = Storyboard.from_json(Path(args.storyboard).read_bytes())
+    times = [final_layout_time(sb)] if args.final else args.times
+    for path in render_stills(sb, times, args.out_dir, args.format, args.width, args.backend):
+        print(f"🖼️  {path}")
+    if args.sheet:
+        print(f"🖼️  {save_still(contact_sheet(sb, times, backend=args.backend), args.sheet)}")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
+import asyncio
 import json
+import os
+import re
 from pathlib import Path
-from openai import OpenAI
+from types import SimpleNamespace
+from openai import OpenAI, AsyncOpenAI
+from layout import solve_layout
 
 def check_collision(el1: dict, el2: dict) -> bool:
     """Check if two elements overlap."""
@@ -34,13 +39,7 @@ def calculate_reading_time(text: str) -> float:
     return (words / 220) * 60
 
 def fix_layout_conflicts(elements: list, narration: str = "", target_duration: float = None) -> list:
-    """Fix overlapping elements by repositioning them with proper spacing."""
-    fixed_elements = elements.copy()
-    
-    # Separate text and image elements
-    text_elements = [el for el in fixed_elements if el["type"] == "text"]
-    image_elements = [el for el in fixed_elements if el["type"] == "image"]
-    
+    """Fix overlapping elements by repositioning them with proper spacing (see layout.solve_layout)."""
     # Use target duration if provided, otherwise calculate from narration
     if target_duration is not None:
         total_duration = target_duration
@@ -53,125 +52,10 @@ def fix_layout_conflicts(elements: list, narration: str = "", target_duration: f
     # Elements should disappear slightly before narration ends (0.5s before)
     visual_end_time = max(1.0, total_duration - 0.5)
     
-    # Text should always be at the top
-    if text_elements:
-        text_elements[0]["x"] = 0.5
-        text_elements[0]["y"] = 0.1
-        text_elements[0]["w"] = 0.8
-        text_elements[0]["h"] = 0.25
-        text_elements[0]["start"] = 0.0
-        text_elements[0]["end"] = visual_end_time
-    
-    # Organize images with better spacing and sequential timing
-    if len(image_elements) == 1:
-        image_elements[0]["x"] = 0.5
-        image_elements[0]["y"] = 0.6
-        image_elements[0]["w"] = 0.3
-        image_elements[0]["h"] = 0.3
-        image_elements[0]["start"] = 1.0
-        image_elements[0]["end"] = visual_end_time
-    elif len(image_elements) == 2:
-        image_elements[0]["x"] = 0.25
-        image_elements[0]["y"] = 0.6
-        image_elements[0]["w"] = 0.3
-        image_elements[0]["h"] = 0.3
-        image_elements[0]["start"] = 1.0
-        image_elements[0]["end"] = visual_end_time
-        
-        image_elements[1]["x"] = 0.75
-        image_elements[1]["y"] = 0.6
-        image_elements[1]["w"] = 0.3
-        image_elements[1]["h"] = 0.3
-        image_elements[1]["start"] = 2.0
-        image_elements[1]["end"] = visual_end_time
-    elif len(image_elements) == 3:
-        image_elements[0]["x"] = 0.2
-        image_elements[0]["y"] = 0.5
-        image_elements[0]["w"] = 0.25
-        image_elements[0]["h"] = 0.25
-        image_elements[0]["start"] = 1.0
-        image_elements[0]["end"] = visual_end_time
-        
-        image_elements[1]["x"] = 0.5
-        image_elements[1]["y"] = 0.5
-        image_elements[1]["w"] = 0.25
-        image_elements[1]["h"] = 0.25
-        image_elements[1]["start"] = 2.0
-        image_elements[1]["end"] = visual_end_time
-        
-        image_elements[2]["x"] = 0.8
-        image_elements[2]["y"] = 0.5
-        image_elements[2]["w"] = 0.25
-        image_elements[2]["h"] = 0.25
-        image_elements[2]["start"] = 3.0
-        image_elements[2]["end"] = visual_end_time
-    elif len(image_elements) == 4:
-        # 2x2 grid with sequential timing
-        image_elements[0]["x"] = 0.25
-        image_elements[0]["y"] = 0.4
-        image_elements[0]["w"] = 0.25
-        image_elements[0]["h"] = 0.25
-        image_elements[0]["start"] = 1.0
-        image_elements[0]["end"] = visual_end_time
-        
-        image_elements[1]["x"] = 0.75
-        image_elements[1]["y"] = 0.4
-        image_elements[1]["w"] = 0.25
-        image_elements[1]["h"] = 0.25
-        image_elements[1]["start"] = 2.0
-        image_elements[1]["end"] = visual_end_time
-        
-        image_elements[2]["x"] = 0.25
-        image_elements[2]["y"] = 0.7
-        image_elements[2]["w"] = 0.25
-        image_elements[2]["h"] = 0.25
-        image_elements[2]["start"] = 3.0
-        image_elements[2]["end"] = visual_end_time
-        
-        image_elements[3]["x"] = 0.75
-        image_elements[3]["y"] = 0.7
-        image_elements[3]["w"] = 0.25
-        image_elements[3]["h"] = 0.25
-        image_elements[3]["start"] = 4.0
-        image_elements[3]["end"] = visual_end_time
-    else:
-        # For 5+ images, use a more complex grid with sequential timing
-        cols = min(3, len(image_elements))
-        rows = (len(image_elements) + cols - 1) // cols
-        
-        for i, img in enumerate(image_elements):
-            col = i % cols
-            row = i // cols
-            
-            # Better spacing to prevent overlaps
-            x = 0.15 + (col * 0.35)  # 0.15, 0.5, 0.85
-            y = 0.4 + (row * 0.25)   # 0.4, 0.65, 0.9
-            
-            img["x"] = x
-            img["y"] = y
-            img["w"] = 0.25
-            img["h"] = 0.25
-            img["start"] = 1.0 + (i * 0.8)  # Stagger appearance
-            img["end"] = visual_end_time
-    
-    return text_elements + image_elements
+    return solve_layout(elements, visual_end_time)
 
-def build_storyboard(narration: str, target_duration: float = None, model: str = "gpt-4o-mini") -> dict:
-    sys_prompt = Path("prompts/storyboard_system.txt").read_text()
-    client = OpenAI()
-    
-    # Use chat completions instead of responses API for broader compatibility
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": sys_prompt},
-            {"role": "user", "content": narration}
-        ],
-        temperature=0.3
-    )
-    
-    text = response.choices[0].message.content
-    
+def parse_storyboard(text: str, narration: str = "", target_duration: float = None) -> dict:
+    """Parse a chat response into a storyboard and fix its layout."""
     try:
         data = json.loads(text)
     except json.JSONDecodeError:
@@ -189,8 +73,149 @@ def build_storyboard(narration: str, target_duration: float = None, model: str =
     # Fix layout conflicts with narration timing
     data["elements"] = fix_layout_conflicts(data["elements"], narration, target_duration)
     
-    # Use target duration if provided, otherwise keep the AI-generated duration
+    # Use target duration if provided, otherwise keep the AI-generated duration,
+    # extended if the fixed layout runs past it
     if target_duration is not None:
         data["scene_duration"] = target_duration
+    elif data["elements"]:
+        data["scene_duration"] = max(float(data["scene_duration"]), max(el["end"] for el in data["elements"]))
     
     return data
+
+def build_storyboard(narration: str, target_duration: float = None, model: str = "gpt-4o-mini") -> dict:
+    sys_prompt = Path("prompts/storyboard_system.txt").read_text()
+    client = OpenAI()
+    
+    # Use chat completions instead of responses API for broader compatibility
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": sys_prompt},
+            {"role": "user", "content": narration}
+        ],
+        temperature=0.3
+    )
+    
+    return parse_storyboard(response.choices[0].message.content, narration, target_duration)
+
+def split_script(script: str, max_seconds: float = None) -> list:
+    """
+    Split a multi-scene script into scene narrations.
+    
+    Paragraphs (blank-line separated) always start a new scene. With
+    max_seconds, paragraphs whose calculate_reading_time exceeds it are split
+    further at sentence boundaries into scenes within the budget.
+    
+    Args:
+        script: Full narration script
+        max_seconds: Optional reading-time budget per scene
+    
+    Returns:
+        List of scene narrations in script order
+    """
+    paragraphs = [" ".join(p.split()) for p in re.split(r"\n\s*\n", script.strip())]
+    paragraphs = [p for p in paragraphs if p]
+    if max_seconds is None:
+        return paragraphs
+    
+    scenes = []
+    for paragraph in paragraphs:
+        current = []
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            if current and calculate_reading_time(" ".join(current + [sentence])) > max_seconds:
+                scenes.append(" ".join(current))
+                current = []
+            current.append(sentence)
+        if current:
+            scenes.append(" ".join(current))
+    return scenes
+
+class StubChatClient:
+    """
+    Offline stand-in for AsyncOpenAI with the same chat.completions.create call.
+    
+    Returns a deterministic storyboard derived from the narration: a title
+    from its first words and one image per sentence (up to four).
+    """
+    
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.chat = self
+        self.completions = self
+    
+    async def create(self, model: str, messages: list, **kwargs):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        narration = messages[-1]["content"]
+        sentences = [s for s in re.split(r"(?<=[.!?])\s+", narration.strip()) if s]
+        words = narration.split()
+        elements = [{"type": "text", "content": " ".join(words[:4]).strip(".,!?"),
+                     "start": 0.0, "end": 1.0, "x": 0.5, "y": 0.1, "w": 0.8, "h": 0.25, "fx": "fade"}]
+        for sentence in sentences[:4]:
+            elements.append({"type": "image", "content": " ".join(sentence.split()[:6]).strip(".,!?"),
+                             "start": 0.0, "end": 1.0, "x": 0.5, "y": 0.5, "w": 0.25, "h": 0.25, "fx": "draw"})
+        content = json.dumps({"scene_duration": max(8.0, calculate_reading_time(narration) + 2.0),
+                              "elements": elements})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def storyboard_client(backend: str = None):
+    """Async chat client for STORYBOARD_BACKEND: "openai" (default) or "stub" (offline)."""
+    backend = backend or os.getenv("STORYBOARD_BACKEND", "openai")
+    if backend == "stub":
+        return StubChatClient()
+    if backend == "openai":
+        return AsyncOpenAI()
+    raise ValueError(f"Unknown storyboard backend '{backend}', expected 'openai' or 'stub'")
+
+async def build_storyboards_async(scenes: list, target_duration: float = None, model: str = "gpt-4o-mini",
+                                  concurrency: int = 4, client=None) -> list:
+    """
+    Generate storyboards for several scene narrations concurrently.
+    
+    Args:
+        scenes: Scene narrations (see split_script)
+        target_duration: Duration applied to every scene, or None to derive it
+        model: Chat model
+        concurrency: Maximum chat calls in flight
+        client: Async chat client (default: storyboard_client())
+    
+    Returns:
+        Storyboards in the order of scenes, each fixed by fix_layout_conflicts
+    """
+    sys_prompt = Path("prompts/storyboard_system.txt").read_text()
+    client = client or storyboard_client()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def build(narration):
+        async with semaphore:
+            response = await client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": sys_prompt},
+                    {"role": "user", "content": narration}
+                ],
+                temperature=0.3
+            )
+        return parse_storyboard(response.choices[0].message.content, narration, target_duration)
+    
+    return await asyncio.gather(*(build(narration) for narration in scenes))
+
+def build_script_storyboards(script: str, max_seconds: float = None, target_duration: float = None,
+                             model: str = "gpt-4o-mini", concurrency: int = 4, backend: str = None) -> list:
+    """
+    Split a multi-scene script and generate its storyboards concurrently.
+    
+    Args:
+        script: Full narration script
+        max_seconds: Optional reading-time budget per scene (see split_script)
+        target_duration: Duration applied to every scene, or None to derive it
+        model: Chat model
+        concurrency: Maximum chat calls in flight
+        backend: "openai" or "stub" (default: STORYBOARD_BACKEND)
+    
+    Returns:
+        One storyboard per scene, in script order
+    """
+    scenes = split_script(script, max_seconds)
+    return asyncio.run(build_storyboards_async(scenes, target_duration, model, concurrency,
+                                               storyboard_client(backend)))
@@ -0,0 +1,31 @@
+"""
+Shared test setup: import the flat modules from whiteboard-system, keep
+clients and calibration offline, and draw stickers locally.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("OPENAI_API_KEY", "offline")  # clients are created at import, never called
+os.environ["RENDER_TIMINGS"] = os.devnull  # stubbed renders must not calibrate the planner
+
+@pytest.fixture
+def offline_stickers(monkeypatch):
+    """Replace sticker generation with bench_compositor's synthetic clipart."""
+    import renderer
+    import compositor
+    import video
+    from bench_compositor import synthetic_clipart
+
+    monkeypatch.setattr(renderer, "gen_clipart", synthetic_clipart)
+    monkeypatch.setattr(compositor, "gen_clipart", synthetic_clipart)
+    monkeypatch.setattr(video, "prefetch_stickers", lambda prompts, *args, **kwargs: {"miss": 0})
+    compositor.clear_caches()
+    yield
+    compositor.clear_caches()
@@ -0,0 +1,67 @@
+"""
+Property tests for the grid layout solver: any element list the chat model
+could return lays out with no overlaps and as a valid storyboard.
+"""
+
+import json
+import random
+
+import pytest
+
+from layout import find_overlaps, solve_layout
+from model import Storyboard
+from storyboard import parse_storyboard
+
+CASES = 2000
+
+def random_element(rng: random.Random, kind: str, duration: float) -> dict:
+    start = rng.uniform(0, duration * 0.9)
+    return {
+        "type": kind,
+        "content": f"{kind} {rng.randrange(1000)}",
+        "start": round(start, 2),
+        "end": round(rng.uniform(start + 0.1, duration), 2),
+        "x": round(rng.uniform(0, 1), 2),
+        "y": round(rng.uniform(0, 1), 2),
+        "w": round(rng.uniform(0.05, 1), 2),
+        "h": round(rng.uniform(0.05, 1), 2),
+        "fx": rng.choice(["none", "fade", "slide_up", "draw"]),
+    }
+
+def random_storyboard(rng: random.Random) -> dict:
+    duration = rng.uniform(4, 15)
+    kinds = ["text"] * rng.randrange(0, 6) + ["image"] * rng.randrange(0, 12)
+    rng.shuffle(kinds)
+    return {"scene_duration": duration, "elements": [random_element(rng, kind, duration) for kind in kinds]}
+
+@pytest.mark.parametrize("target_duration", [None, 8.0])
+def test_random_storyboards_lay_out_without_overlaps(target_duration):
+    rng = random.Random(target_duration)
+    for _ in range(CASES):
+        data = random_storyboard(rng)
+        result = parse_storyboard(json.dumps(data), "", target_duration)
+
+        assert find_overlaps(result["elements"]) == []
+        assert len(result["elements"]) == len(data["elements"])
+        Storyboard.from_dict(result)
+
+def test_large_caption_leaves_room_for_an_image():
+    elements = [
+        {"type": "text", "content": "Title", "start": 0, "end": 5, "x": 0.5, "y": 0.1, "w": 0.8, "h": 0.25},
+        {"type": "text", "content": "Caption", "start": 0, "end": 5, "x": 0.5, "y": 0.4, "w": 0.8, "h": 0.4},
+        {"type": "image", "content": "Vial", "start": 1, "end": 5, "x": 0.5, "y": 0.5, "w": 0.3, "h": 0.3},
+    ]
+    result = solve_layout(elements, 4.5)
+
+    assert find_overlaps(result) == []
+    # Both texts stay on screen for the whole scene
+    assert [el["end"] for el in result[:2]] == [4.5, 4.5]
+
+def test_many_captions_are_paged_with_the_images():
+    elements = [{"type": "text", "content": f"Caption {i}", "start": 0, "end": 8,
+                 "x": 0.5, "y": 0.5, "w": 0.6, "h": 0.3} for i in range(8)]
+    elements.append({"type": "image", "content": "Chart", "start": 0, "end": 8, "x": 0.5, "y": 0.5, "w": 0.3, "h": 0.3})
+    result = solve_layout(elements, 7.5)
+
+    assert find_overlaps(result) == []
+    assert any(el["end"] < 7.5 for el in result if el["type"] == "text")
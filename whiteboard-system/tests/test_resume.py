@@ -0,0 +1,92 @@
+"""
+Checkpointed renders: a render killed partway and run again must produce the
+same file as one that was never interrupted.
+"""
+
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench_compositor import synthetic_storyboard
+from video import MANIFEST_FILE, parts_dir, render_video
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FPS = 10  # 20-frame chunks keep the test quick
+SECONDS = 16.0
+CHUNKS = 9  # ceil((SECONDS + 0.1) * FPS / 20)
+
+# Renders the storyboard at argv[1] to argv[2] with offline stickers
+CHILD = """
+import json, sys
+import renderer, compositor, video
+from bench_compositor import synthetic_clipart
+renderer.gen_clipart = compositor.gen_clipart = synthetic_clipart
+video.prefetch_stickers = lambda prompts, *args, **kwargs: {"miss": 0}
+video.render_video(json.load(open(sys.argv[1])), sys.argv[2], fps=%d, backend="numpy")
+""" % FPS
+
+def short_storyboard() -> dict:
+    storyboard = synthetic_storyboard(3)
+    for i, el in enumerate(storyboard["elements"]):
+        el["start"] = float(i)
+        el["end"] = SECONDS
+    storyboard["elements"].append({
+        "type": "text", "content": "Resume test", "start": 0.0, "end": SECONDS,
+        "x": 0.5, "y": 0.0, "w": 0.8, "h": 0.2, "fx": "none",
+    })
+    storyboard["scene_duration"] = SECONDS
+    return storyboard
+
+def completed_chunks(output_path) -> int:
+    try:
+        return len(json.loads((parts_dir(output_path) / MANIFEST_FILE).read_text())["completed"])
+    except (OSError, ValueError, KeyError):
+        return 0
+
+def test_killed_render_resumes_to_identical_output(tmp_path, offline_stickers, caplog):
+    storyboard = short_storyboard()
+    storyboard_file = tmp_path / "storyboard.json"
+    storyboard_file.write_text(json.dumps(storyboard))
+
+    expected = tmp_path / "uninterrupted.mp4"
+    render_video(storyboard, str(expected), fps=FPS, backend="numpy")
+
+    resumed = tmp_path / "resumed.mp4"
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    child = subprocess.Popen([sys.executable, "-c", CHILD, str(storyboard_file), str(resumed)], cwd=ROOT, env=env)
+    deadline = time.monotonic() + 120
+    while completed_chunks(resumed) < 2 and child.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    child.send_signal(signal.SIGKILL)
+    child.wait()
+
+    assert child.returncode == -signal.SIGKILL, "render finished before it could be killed"
+    assert not resumed.exists()
+    done = completed_chunks(resumed)
+    assert 2 <= done < CHUNKS
+
+    with caplog.at_level(logging.INFO, logger="video"):
+        render_video(storyboard, str(resumed), fps=FPS, backend="numpy")
+
+    assert f"Resuming: {done}/{CHUNKS} chunks already rendered" in caplog.text
+    assert not parts_dir(resumed).exists()
+    assert resumed.read_bytes() == expected.read_bytes()
+
+def test_output_path_with_quote(tmp_path, offline_stickers):
+    storyboard = short_storyboard()
+    storyboard["scene_duration"] = 4.0  # still more than one chunk
+    for el in storyboard["elements"]:
+        el["start"], el["end"] = 0.0, 4.0
+
+    output = tmp_path / "Bob's video" / "Bob's video.mp4"
+    output.parent.mkdir()
+    render_video(storyboard, str(output), fps=FPS, backend="numpy")
+
+    assert output.stat().st_size > 0
+    assert not parts_dir(output).exists()
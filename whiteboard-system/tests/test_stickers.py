@@ -0,0 +1,49 @@
+"""
+Sticker cache matching: a cached sticker is only reused for a prompt that
+differs by added words, never for one that swaps a word.
+"""
+
+import pytest
+
+from stickers import lookup_sticker, normalize_prompt, _cache_key
+
+SIZE = "1024x1024"
+
+def cache_sticker(cache_dir, prompt: str):
+    """Put a placeholder sticker for prompt in the cache and index it."""
+    cache_dir.mkdir(exist_ok=True)
+    (cache_dir / f"{_cache_key(normalize_prompt(prompt), SIZE)}.png").write_bytes(b"")
+    assert lookup_sticker(prompt, SIZE, str(cache_dir))[1] == "exact"
+
+@pytest.mark.parametrize("cached, prompt", [
+    ("doctor holding a syringe next to a patient", "nurse holding a syringe next to a patient"),
+    ("large red apple on a wooden table", "large green apple on a wooden table"),
+    ("3 people waiting in line at a clinic", "5 people waiting in line at a clinic"),
+])
+def test_swapped_word_is_not_reused(tmp_path, cached, prompt):
+    cache_sticker(tmp_path / "cache", cached)
+    assert lookup_sticker(prompt, SIZE, str(tmp_path / "cache"))[1] == "miss"
+
+@pytest.mark.parametrize("cached, prompt", [
+    ("vaccine vial", "A simple vaccine vial"),
+    ("vaccine vial", "vaccine vial with medical cross"),
+    ("simple vaccine vial", "vaccine vial"),
+])
+def test_added_words_reuse_the_sticker(tmp_path, cached, prompt):
+    cache_dir = tmp_path / "cache"
+    cache_sticker(cache_dir, cached)
+    cache_file, kind = lookup_sticker(prompt, SIZE, str(cache_dir))
+    assert kind == "fuzzy"
+    assert cache_file.stem == _cache_key(normalize_prompt(cached), SIZE)
+
+def test_reordered_words_are_not_reused(tmp_path):
+    cache_sticker(tmp_path / "cache", "vial of vaccine")
+    assert lookup_sticker("vaccine vial", SIZE, str(tmp_path / "cache"))[1] == "miss"
+
+def test_closest_of_several_matches_wins(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cache_sticker(cache_dir, "vaccine vial with medical cross and label")
+    cache_sticker(cache_dir, "simple vaccine vial")
+    cache_file, kind = lookup_sticker("vaccine vial", SIZE, str(cache_dir))
+    assert kind == "fuzzy"
+    assert cache_file.stem == _cache_key(normalize_prompt("simple vaccine vial"), SIZE)
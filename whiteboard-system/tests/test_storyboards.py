@@ -0,0 +1,74 @@
+"""
+Multi-scene storyboard generation with the offline stub client: scenes come
+back in script order, laid out without overlaps, with at most concurrency
+chat calls in flight.
+"""
+
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from layout import find_overlaps
+from model import Storyboard
+from storyboard import StubChatClient, build_script_storyboards, build_storyboards_async, split_script
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCRIPT = """
+Vaccines train the immune system. They show it a harmless piece of a germ.
+
+The body makes antibodies. Memory cells remember the germ for years.
+Later infections are stopped early.
+
+Herd immunity protects people who cannot be vaccinated. Newborns and the sick rely on it.
+
+Side effects are usually mild. A sore arm or a light fever passes in a day or two.
+
+Talk to a doctor about which vaccines you need.
+"""
+
+class CountingClient(StubChatClient):
+    """Stub that records how many calls overlap; later scenes answer first."""
+
+    def __init__(self, scenes: list):
+        super().__init__()
+        self.delays = {narration: 0.01 * (len(scenes) - i) for i, narration in enumerate(scenes)}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model: str, messages: list, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delays[messages[-1]["content"]])
+            return await super().create(model, messages, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+def title(storyboard: dict) -> str:
+    return next(el["content"] for el in storyboard["elements"] if el["type"] == "text")
+
+@pytest.mark.parametrize("max_seconds", [None, 4.0])
+def test_script_storyboards_in_order_without_overlaps(monkeypatch, max_seconds):
+    monkeypatch.chdir(ROOT)  # the system prompt is read relative to the repo
+    scenes = split_script(SCRIPT, max_seconds)
+    assert len(scenes) >= 5
+
+    storyboards = build_script_storyboards(SCRIPT, max_seconds, concurrency=2, backend="stub")
+
+    assert [title(sb) for sb in storyboards] == [" ".join(s.split()[:4]).strip(".,!?") for s in scenes]
+    for sb in storyboards:
+        Storyboard.from_dict(sb)
+        assert find_overlaps(sb["elements"]) == []
+
+@pytest.mark.parametrize("concurrency", [1, 2, 3])
+def test_concurrency_cap(monkeypatch, concurrency):
+    monkeypatch.chdir(ROOT)
+    scenes = split_script(SCRIPT, 4.0)
+    client = CountingClient(scenes)
+
+    storyboards = asyncio.run(build_storyboards_async(scenes, concurrency=concurrency, client=client))
+
+    assert client.max_in_flight == concurrency
+    assert [title(sb) for sb in storyboards] == [" ".join(s.split()[:4]).strip(".,!?") for s in scenes]
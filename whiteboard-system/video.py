@@ -1,48 +1,755 @@
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
 import numpy as np
-from moviepy.editor import ImageSequenceClip, AudioFileClip
-from renderer import composite_frame
+from moviepy.config import get_setting
+from renderer import W, H, composite_frame, use_bundled_font, load_text_sprite
+from compositor import FrameCompositor, clear_caches
+from stickers import prefetch_stickers, lookup_sticker, cache_stats
+from planner import plan_render, record_timings, workload, estimate_memory
+from model import Storyboard, ElementType
 
-def render_video(storyboard: dict, output_path="scene.mp4", fps=30, audio_path=None, target_duration=None):
-    # Use target_duration if provided, otherwise use storyboard duration
-    if target_duration is not None:
-        T = float(target_duration)
-        # Update storyboard duration to match target
-        storyboard["scene_duration"] = T
-    else:
-        T = float(storyboard["scene_duration"])
+logger = logging.getLogger(__name__)
+
+# Compositing backends: "pil" (renderer.composite_frame) or "numpy" (compositor)
+BACKENDS = ("pil", "numpy")
+
+# Renders are checkpointed as independently decodable chunks of this length
+CHUNK_SECONDS = 2.0
+
+# Output renditions: name -> (width, height, video bitrate)
+RENDITIONS = {
+    "1080p": (1920, 1080, "6M"),
+    "720p": (1280, 720, "3M"),
+    "480p": (854, 480, "1500k"),
+}
+
+MANIFEST_FILE = "manifest.json"
+
+# Narration codecs an MP4 can carry as-is; anything else is transcoded to AAC
+COPY_AUDIO_CODECS = ("aac", "mp3", "alac")
+
+# Narration this much shorter than the video is padded with silence
+AUDIO_PAD_TOLERANCE = 0.05
+
+# Preview segments are short so the first one is playable almost immediately
+PREVIEW_SEGMENT_SECONDS = 1.0
+PREVIEW_PLAYLIST = "index.m3u8"
+PREVIEW_SEGMENT_PREFIX = "segment_"
+
+# Minimum seconds between progress events while frames are rendering
+PROGRESS_INTERVAL = 0.5
+
+class RenderCancelled(Exception):
+    """Raised by render_video when its cancel event is set mid-render."""
+
+@dataclass
+class ProgressEvent:
+    """
+    Snapshot of a render passed to render_video's progress callback.
+    
+    stage is one of "stickers", "rendering", "muxing" or "done"; fps and
+    eta_seconds cover frames rendered in this run (resumed chunks count as
+    done). cache holds sticker cache counters and text sprite cache hits.
+    """
+    stage: str
+    frames_done: int
+    frames_total: int
+    fps: float
+    eta_seconds: float
+    elapsed_seconds: float
+    cache: dict
+    
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+class ProgressReporter:
+    """
+    Counts frames and calls back with a ProgressEvent on every stage change
+    and at most every PROGRESS_INTERVAL seconds in between, so the per-frame
+    path costs a counter increment and a clock read.
+    """
+    
+    def __init__(self, callback, frames_total: int, interval: float = PROGRESS_INTERVAL):
+        self.callback = callback
+        self.frames_total = frames_total
+        self.interval = interval
+        self.stage_name = None
+        self.frames_done = 0
+        self.frames_skipped = 0
+        self.started = time.perf_counter()
+        self.render_started = None
+        self.last_event = 0.0
+    
+    def stage(self, name: str):
+        self.stage_name = name
+        if name == "rendering":
+            self.render_started = time.perf_counter()
+        self.emit()
+    
+    def skip(self, frames: int):
+        """Count frames already rendered by an earlier attempt."""
+        self.frames_done += frames
+        self.frames_skipped += frames
+    
+    def frame(self):
+        self.frames_done += 1
+        if self.callback is not None and time.perf_counter() - self.last_event >= self.interval:
+            self.emit()
+    
+    def event(self) -> ProgressEvent:
+        now = time.perf_counter()
+        rendered = self.frames_done - self.frames_skipped
+        seconds = now - self.render_started if self.render_started is not None else 0.0
+        fps = rendered / seconds if seconds > 0 else 0.0
+        remaining = self.frames_total - self.frames_done
+        text_cache = load_text_sprite.cache_info()
+        return ProgressEvent(
+            stage=self.stage_name,
+            frames_done=self.frames_done,
+            frames_total=self.frames_total,
+            fps=round(fps, 2),
+            eta_seconds=round(remaining / fps, 2) if fps > 0 else None,
+            elapsed_seconds=round(now - self.started, 2),
+            cache={"stickers": cache_stats(), "text_sprites": {"hits": text_cache.hits, "misses": text_cache.misses}},
+        )
+    
+    def emit(self):
+        self.last_event = time.perf_counter()
+        if self.callback is not None:
+            self.callback(self.event())
+
+# Seconds between RSS samples while rendering
+RSS_INTERVAL = 0.05
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes, or 0 if unknown (non-Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+class RSSSampler:
+    """
+    Highest RSS seen while active, sampled on a thread, so one render's peak
+    isn't the lifetime peak of a long-lived process. RSS is per process, so
+    samplers that overlap (concurrent renders in the daemon) are all marked
+    shared: their peaks include each other's memory.
+    """
+    _active = set()
+    _lock = threading.Lock()
+    
+    def __init__(self, interval: float = RSS_INTERVAL):
+        self.interval = interval
+        self.peak = 0
+        self.shared = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
     
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss())
+            self._stop.wait(self.interval)
+    
+    def start(self) -> "RSSSampler":
+        with RSSSampler._lock:
+            if RSSSampler._active:
+                self.shared = True
+                for other in RSSSampler._active:
+                    other.shared = True
+            RSSSampler._active.add(self)
+        self.peak = current_rss()
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        with RSSSampler._lock:
+            RSSSampler._active.discard(self)
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc):
+        self.stop()
+
+def storyboard_hash(storyboard: Storyboard, **settings) -> str:
+    """Stable hash of a storyboard plus the render settings that affect its pixels."""
+    payload = json.dumps({"storyboard": storyboard.to_dict(), "settings": settings}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def parts_dir(output_path: str) -> Path:
+    """Directory holding the checkpoint chunks and manifest of a render."""
+    return Path(f"{output_path}.parts")
+
+def _chunk_name(index: int, rendition: str = None) -> str:
+    return f"chunk_{index:05d}_{rendition}.mp4" if rendition else f"chunk_{index:05d}.mp4"
+
+def rendition_paths(output_path: str, renditions: list) -> dict:
+    """Output file per rendition: scene.mp4 -> scene_720p.mp4 and so on."""
+    path = Path(output_path)
+    return {name: str(path.with_name(f"{path.stem}_{name}{path.suffix}")) for name in renditions}
+
+def _load_manifest(directory: Path, render_hash: str) -> dict:
+    """
+    Manifest of a previous attempt at the same render, or a fresh one.
+    
+    Chunks are only trusted if the manifest's hash matches and the chunk file exists.
+    """
+    path = directory / MANIFEST_FILE
+    if path.exists():
+        try:
+            manifest = json.loads(path.read_text())
+        except ValueError:
+            manifest = None
+        if manifest and manifest.get("hash") == render_hash:
+            renditions = manifest.get("renditions") or [None]
+            manifest["completed"] = [i for i in manifest["completed"]
+                                     if all((directory / _chunk_name(i, r)).exists() for r in renditions)]
+            return manifest
+    if directory.exists():
+        shutil.rmtree(directory)
+    directory.mkdir(parents=True)
+    return {"hash": render_hash, "completed": []}
+
+def _save_manifest(directory: Path, manifest: dict, name: str = MANIFEST_FILE):
+    tmp = directory / f"{name}.tmp"
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(directory / name)
+
+def _shard_manifest_name(index: int, count: int) -> str:
+    return f"shard_{index:03d}_of_{count:03d}.json"
+
+def _load_shard_manifest(directory: Path, render_hash: str, index: int, count: int) -> dict:
+    """
+    Manifest of one shard. Unlike _load_manifest this never clears the
+    directory, since other shards may be writing to it at the same time.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / _shard_manifest_name(index, count)
+    if path.exists():
+        try:
+            manifest = json.loads(path.read_text())
+        except ValueError:
+            manifest = None
+        if manifest and manifest.get("hash") == render_hash:
+            renditions = manifest.get("renditions") or [None]
+            manifest["completed"] = [i for i in manifest["completed"]
+                                     if all((directory / _chunk_name(i, r)).exists() for r in renditions)]
+            manifest["done"] = False
+            return manifest
+    return {"hash": render_hash, "completed": [], "done": False}
+
+def shard_chunks(chunk_count: int, index: int, count: int) -> range:
+    """Contiguous chunk indices rendered by shard index of count."""
+    return range(index * chunk_count // count, (index + 1) * chunk_count // count)
+
+def _resolve_outputs(output_path: str, renditions: list) -> dict:
+    """Rendition name -> output path (None -> output_path when renditions is empty)."""
+    if not renditions:
+        return {None: output_path}
+    unknown = [name for name in renditions if name not in RENDITIONS]
+    if unknown:
+        raise ValueError(f"Unknown renditions {unknown}, expected names from {list(RENDITIONS)}")
+    return rendition_paths(output_path, renditions)
+
+def _chunk_plan(storyboard: Storyboard, fps: int, backend: str, renditions: list) -> tuple:
+    """
+    (total_duration, frames, chunk_frames, chunk_count, render hash) of a render.
+    
+    Everything that decides chunk boundaries and pixels goes into the hash, so
+    shards and resumed attempts only ever combine chunks of the same render.
+    """
     # No extra fade time - animation should end exactly when narration ends
     # Only add a small buffer (0.1s) to ensure smooth ending
     fade_time = 0.1
-    total_duration = T + fade_time
-    
-    frames = []
+    total_duration = storyboard.scene_duration + fade_time
     total = int(total_duration * fps)
+    chunk_frames = max(1, int(CHUNK_SECONDS * fps))
+    chunk_count = -(-total // chunk_frames)
+    render_hash = storyboard_hash(storyboard, fps=fps, backend=backend, frames=total,
+                                  chunk_frames=chunk_frames, renditions=renditions)
+    return total_duration, total, chunk_frames, chunk_count, render_hash
+
+def encode_frames(frames, outputs: list, fps: int):
+    """
+    Encode an iterable of full-size RGB frames to one or more standalone H.264 files.
+    
+    All outputs come from a single ffmpeg process: frames are piped in once and
+    its filter graph splits and downscales them in-pipeline, so every
+    rendition is encoded concurrently from the same composite. Files are
+    written under temporary names first so a killed encode never leaves one
+    that looks complete.
+    
+    Args:
+        frames: Iterable of (H, W, 3) uint8 arrays
+        outputs: List of (path, width, height, bitrate)
+        fps: Frames per second
+    """
+    temps = [Path(p).with_name(f"{Path(p).stem}.tmp{Path(p).suffix}") for p, *_ in outputs]
+    
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+           "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{W}x{H}", "-pix_fmt", "rgb24",
+           "-r", str(fps), "-i", "-"]
+    if len(outputs) > 1:
+        graph = f"[0:v]split={len(outputs)}" + "".join(f"[s{i}]" for i in range(len(outputs)))
+        for i, (_, width, height, _) in enumerate(outputs):
+            graph += f";[s{i}]scale={width}:{height}:flags=bicubic[v{i}]"
+        cmd += ["-filter_complex", graph]
+    for i, ((_, width, height, bitrate), tmp) in enumerate(zip(outputs, temps)):
+        if len(outputs) > 1:
+            cmd += ["-map", f"[v{i}]"]
+        elif (width, height) != (W, H):
+            cmd += ["-vf", f"scale={width}:{height}:flags=bicubic"]
+        cmd += ["-c:v", "libx264", "-preset", "medium", "-b:v", bitrate, "-pix_fmt", "yuv420p", str(tmp)]
+    
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frame in frames:
+            proc.stdin.write(np.ascontiguousarray(frame).data)
+        proc.stdin.close()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    if proc.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed: {proc.stderr.read().decode(errors='replace').strip()}")
+    
+    for (path, *_), tmp in zip(outputs, temps):
+        tmp.replace(path)
+
+class PreviewStream:
+    """
+    Low-latency HLS preview of frames as they are rendered.
     
-    print(f"Rendering {total} frames at {fps} FPS...")
+    Frames written here are downscaled and encoded by a fast ffmpeg process
+    into PREVIEW_SEGMENT_SECONDS segments under directory. The playlist is
+    rewritten after every finished segment, so a player pointed at it (ffplay,
+    VLC, hls.js) can start playing the first second while rendering continues.
+    Only the playlist and segments of an earlier preview in directory are
+    replaced; nothing else there is touched.
+    """
     
-    for i in range(total):
-        t = i / fps
-        frame = composite_frame(t, storyboard)
-        frames.append(np.array(frame))
+    def __init__(self, directory: str, fps: int, rendition: str = "480p"):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.playlist = self.directory / PREVIEW_PLAYLIST
+        for pattern in (f"{PREVIEW_PLAYLIST}*", f"{PREVIEW_SEGMENT_PREFIX}*.ts*"):
+            for stale in self.directory.glob(pattern):
+                stale.unlink()
         
-        if i % 10 == 0:  # Progress indicator
-            print(f"Frame {i+1}/{total}")
+        width, height, bitrate = RENDITIONS[rendition]
+        cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+               "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{W}x{H}", "-pix_fmt", "rgb24",
+               "-r", str(fps), "-i", "-",
+               "-vf", f"scale={width}:{height}:flags=bilinear",
+               "-c:v", "libx264", "-preset", "ultrafast", "-tune", "zerolatency",
+               "-b:v", bitrate, "-pix_fmt", "yuv420p",
+               # A keyframe at every segment boundary so each segment stands alone
+               "-g", str(max(1, int(PREVIEW_SEGMENT_SECONDS * fps))),
+               "-force_key_frames", f"expr:gte(t,n_forced*{PREVIEW_SEGMENT_SECONDS})",
+               "-f", "hls", "-hls_time", str(PREVIEW_SEGMENT_SECONDS), "-hls_list_size", "0",
+               "-hls_playlist_type", "event", "-hls_flags", "independent_segments+temp_file",
+               "-hls_segment_filename", str(self.directory / f"{PREVIEW_SEGMENT_PREFIX}%05d.ts"),
+               str(self.playlist)]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
     
-    clip = ImageSequenceClip(frames, fps=fps)
+    def write(self, frame: np.ndarray):
+        self.proc.stdin.write(np.ascontiguousarray(frame).data)
+    
+    def close(self):
+        """Flush the last segment and mark the playlist complete."""
+        self.proc.stdin.close()
+        if self.proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg preview failed: {self.proc.stderr.read().decode(errors='replace').strip()}")
+    
+    def abort(self):
+        self.proc.kill()
+        self.proc.wait()
+
+def probe_audio(audio_path: str) -> tuple:
+    """
+    Codec name and duration (seconds) of a file's first audio stream.
+    
+    Read from ffmpeg's header dump, so nothing is decoded. Either value is
+    None if ffmpeg doesn't report it.
+    """
+    result = subprocess.run([get_setting("FFMPEG_BINARY"), "-hide_banner", "-i", audio_path],
+                            capture_output=True, text=True)
+    codec = re.search(r"Stream #.*?Audio: (\w+)", result.stderr)
+    length = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+    if length:
+        hours, minutes, seconds = length.groups()
+        length = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return (codec.group(1) if codec else None), length
+
+def check_audio(audio_path: str):
+    """
+    Fail fast on narration that concat_chunks couldn't mux.
+    
+    Raises:
+        FileNotFoundError: If audio_path doesn't exist
+        ValueError: If ffmpeg finds no audio stream in it
+    """
+    if not Path(audio_path).is_file():
+        raise FileNotFoundError(f"Narration file not found: {audio_path}")
+    codec, _ = probe_audio(audio_path)
+    if codec is None:
+        raise ValueError(f"No audio stream in narration file: {audio_path}")
+
+def audio_args(audio_path: str, duration: float = None) -> list:
+    """
+    ffmpeg output options that fit narration to a video of duration seconds.
+    
+    Compatible narration at least as long as the video is stream-copied and
+    trimmed by the caller's -t. Narration that needs transcoding, or is too
+    short and has to be padded with silence, is re-encoded to AAC by ffmpeg
+    as it streams.
+    """
+    codec, length = probe_audio(audio_path)
+    too_short = duration is not None and length is not None and length < duration - AUDIO_PAD_TOLERANCE
+    if codec in COPY_AUDIO_CODECS and not too_short:
+        return ["-c:a", "copy"]
+    args = ["-c:a", "aac", "-b:a", "192k"]
+    if too_short:
+        args += ["-af", "apad"]
+    return args
+
+def concat_chunks(chunk_paths: list, output_path: str, audio_path: str = None, duration: float = None):
+    """
+    Join chunks into one MP4 without re-encoding video, optionally adding
+    narration (see audio_args) cut or padded to duration.
+    """
+    listing = Path(chunk_paths[0]).parent / "chunks.txt"
+    # The concat demuxer reads quoted paths; a quote inside one is written '\''
+    quoted = (str(Path(p).resolve()).replace("'", "'\\''") for p in chunk_paths)
+    listing.write_text("".join(f"file '{path}'\n" for path in quoted))
+    
+    cmd = [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error",
+           "-f", "concat", "-safe", "0", "-i", str(listing)]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"] + audio_args(audio_path, duration)
+        if duration is not None:
+            cmd += ["-t", f"{duration:.3f}"]
+    cmd += ["-c:v", "copy", "-movflags", "+faststart", output_path]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg concat failed: {result.stderr.decode(errors='replace').strip()}")
+
+def render_video(storyboard, output_path="scene.mp4", fps=30, audio_path=None, target_duration=None, backend=None, cancel=None, dry_run=False, resume=True, renditions=None,
+                 preview_dir=None, preview_only=False, shard=None, progress=None):
+    """
+    Render a storyboard to an MP4.
+    
+    Frames are streamed to ffmpeg in CHUNK_SECONDS chunks kept under
+    <output_path>.parts with a manifest, then joined without re-encoding. If a
+    render dies partway, running it again with the same storyboard and settings
+    resumes from the first incomplete chunk.
+    
+    Args:
+        storyboard: model.Storyboard or a storyboard dict (validated here)
+        cancel: Optional threading.Event; setting it stops the render with RenderCancelled
+        dry_run: Return planner.plan_render's estimate instead of rendering
+        resume: Reuse chunks left by an earlier attempt (False starts over)
+        renditions: Names from RENDITIONS (e.g. ["1080p", "720p", "480p"]) to
+                    produce from one composite pass, written next to output_path
+                    as <stem>_<name>.mp4; None writes only output_path at 1080p
+        preview_dir: Also stream a low-latency HLS preview (see PreviewStream)
+                     of the frames rendered in this run to this directory
+        preview_only: Skip the full-quality render and only write the preview
+        shard: (index, count) to render only that shard's share of the chunks
+               into <output_path>.parts and return without joining them; see
+               merge_shards. Shards use the bundled font and never generate
+               stickers, so every host renders identical pixels.
+        progress: Optional callable taking a ProgressEvent, called on each
+                  stage change and at most every PROGRESS_INTERVAL seconds
+                  while frames render. Nothing is printed per frame; status
+                  lines go to this module's logger.
+    
+    Returns:
+        Dict of rendition name -> path when renditions is given, the preview
+        playlist path when preview_only is set, the shard's chunk paths for a
+        shard
+    
+    Raises:
+        FileNotFoundError, ValueError: If audio_path is missing or has no
+            audio stream, before any frame is rendered (see check_audio)
+    """
+    backend = backend or os.getenv("RENDER_BACKEND", "pil")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown render backend '{backend}', expected one of {BACKENDS}")
+    
+    if dry_run:
+        return plan_render(storyboard, fps=fps, target_duration=target_duration, backend=backend)
+    
+    if preview_only and not preview_dir:
+        raise ValueError("preview_only needs a preview_dir")
+    if shard is not None:
+        shard_index, shard_count = shard
+        if not 0 <= shard_index < shard_count:
+            raise ValueError(f"Shard index {shard_index} out of range for {shard_count} shards")
+        if preview_dir:
+            raise ValueError("Shards can't stream a preview")
+    if audio_path and shard is None and not preview_only:
+        check_audio(audio_path)
+    
+    outputs = _resolve_outputs(output_path, renditions)
+    
+    # Use target_duration if provided, otherwise use storyboard duration
+    storyboard = Storyboard.coerce(storyboard, target_duration)
+    total_duration, total, chunk_frames, chunk_count, render_hash = _chunk_plan(storyboard, fps, backend, renditions)
+    if shard is not None:
+        chunks = shard_chunks(chunk_count, shard_index, shard_count)
+        frames_total = min(chunks.stop * chunk_frames, total) - min(chunks.start * chunk_frames, total)
+    else:
+        chunks = range(chunk_count)
+        frames_total = total
+    reporter = ProgressReporter(progress, frames_total)
+    reporter.stage("stickers")
+    
+    # Resolve every sticker once so misses are generated before the frame loop
+    started = time.perf_counter()
+    image_prompts = [el.content for el in storyboard.elements if el.type is ElementType.IMAGE]
+    if shard is not None:
+        # Generation isn't reproducible, so every shard must find the same cached stickers
+        missing = [p for p in dict.fromkeys(image_prompts) if lookup_sticker(p)[1] == "miss"]
+        if missing:
+            raise RuntimeError(f"Stickers not cached for shard rendering: {missing}. "
+                               f"Run 'python shard.py prefetch' against the shared cache first")
+        use_bundled_font()
+        clear_caches()
+        sticker_stats = {"miss": 0}
+    else:
+        sticker_stats = prefetch_stickers(image_prompts) if image_prompts else {"miss": 0}
+    stickers_done = time.perf_counter()
+    
+    composite_seconds = 0.0
+    preview = PreviewStream(preview_dir, fps) if preview_dir else None
+    
+    def render_frames(first, last):
+        nonlocal composite_seconds
+        # Each chunk starts from a full redraw so it doesn't depend on the previous one
+        compositor = FrameCompositor(storyboard) if backend == "numpy" else None
+        for i in range(first, last):
+            if cancel is not None and cancel.is_set():
+                raise RenderCancelled(f"Render of {output_path} cancelled at frame {i}/{total}")
+            
+            t = i / fps
+            frame_started = time.perf_counter()
+            if compositor is not None:
+                frame = compositor.render(t)
+            else:
+                frame = np.asarray(composite_frame(t, storyboard))
+            composite_seconds += time.perf_counter() - frame_started
+            if preview is not None:
+                preview.write(frame)
+            yield frame
+            reporter.frame()
+    
+    if preview_only:
+        logger.info("Streaming %d preview frames to %s...", total, preview.playlist)
+        reporter.stage("rendering")
+        try:
+            for _ in render_frames(0, total):
+                pass
+        except BaseException:
+            preview.abort()
+            raise
+        preview.close()
+        reporter.stage("done")
+        logger.info("Preview saved to %s", preview.playlist)
+        return str(preview.playlist)
+    
+    directory = parts_dir(output_path)
+    if shard is not None:
+        manifest_name = _shard_manifest_name(shard_index, shard_count)
+        manifest = _load_shard_manifest(directory, render_hash, shard_index, shard_count)
+        if not resume:
+            manifest["completed"] = []
+    else:
+        manifest_name = MANIFEST_FILE
+        if not resume and directory.exists():
+            shutil.rmtree(directory)
+        manifest = _load_manifest(directory, render_hash)
+    manifest.update({"fps": fps, "frames": total, "chunk_frames": chunk_frames, "chunks": chunk_count,
+                     "renditions": renditions})
+    _save_manifest(directory, manifest, manifest_name)
+    
+    if manifest["completed"]:
+        logger.info("Resuming: %d/%d chunks already rendered", len(manifest["completed"]), len(chunks))
+    if shard is not None:
+        logger.info("Rendering shard %d/%d: chunks %d-%d of %d",
+                    shard_index + 1, shard_count, chunks.start, chunks.stop - 1, chunk_count)
+    else:
+        logger.info("Rendering %d frames at %d FPS...", total, fps)
+    
+    # Timings from a resumed render only cover some chunks; keep them out of calibration
+    resumed = bool(manifest["completed"])
+    reporter.stage("rendering")
+    rss = RSSSampler().start()
+    try:
+        for index in chunks:
+            if index in manifest["completed"]:
+                reporter.skip(min(chunk_frames, total - index * chunk_frames))
+                continue
+            first = index * chunk_frames
+            chunk_outputs = []
+            for name in outputs:
+                width, height, bitrate = RENDITIONS[name or "1080p"]
+                chunk_outputs.append((directory / _chunk_name(index, name), width, height, bitrate))
+            encode_frames(render_frames(first, min(first + chunk_frames, total)), chunk_outputs, fps)
+            manifest["completed"].append(index)
+            _save_manifest(directory, manifest, manifest_name)
+    except BaseException:
+        if preview is not None:
+            preview.abort()
+        raise
+    finally:
+        rss.stop()
+    if preview is not None:
+        preview.close()
+    
+    if shard is not None:
+        manifest["done"] = True
+        _save_manifest(directory, manifest, manifest_name)
+        reporter.stage("done")
+        logger.info("Shard %d/%d done", shard_index + 1, shard_count)
+        return [str(directory / _chunk_name(i, name)) for i in chunks for name in outputs]
+    
+    reporter.stage("muxing")
+    for name, path in outputs.items():
+        concat_chunks([directory / _chunk_name(i, name) for i in range(chunk_count)],
+                      path, audio_path, total_duration)
+    shutil.rmtree(directory)
+    
+    # Calibration data for planner.plan_render
+    if not resumed:
+        work = workload(storyboard, fps)
+        record_timings({
+            "time": time.time(),
+            "backend": backend,
+            "fps": fps,
+            "frames": total,
+            "element_frames": work["element_frames"],
+            "images": work["images"],
+            "text_chars": work["text_chars"],
+            "stickers_generated": sticker_stats["miss"],
+            "sticker_seconds": stickers_done - started,
+            "composite_seconds": composite_seconds,
+            "encode_seconds": time.perf_counter() - stickers_done - composite_seconds,
+            "estimated_memory": estimate_memory(storyboard, total),
+            # 0 (unknown) when another render shared the process
+            "peak_rss": 0 if rss.shared else rss.peak,
+        })
+    
+    reporter.stage("done")
+    for path in outputs.values():
+        logger.info("Video saved to %s", path)
+    
+    if renditions:
+        return outputs
 
+def log_progress(event: ProgressEvent):
+    """Progress callback for command-line renders: one log line per event."""
+    if event.eta_seconds is not None:
+        logger.info("%s: frame %d/%d (%.1f fps, ETA %.0fs)", event.stage, event.frames_done, event.frames_total,
+                    event.fps, event.eta_seconds)
+    else:
+        logger.info("%s: frame %d/%d (%.1f fps)", event.stage, event.frames_done, event.frames_total, event.fps)
+
+def render_events(storyboard, output_path="scene.mp4", **kwargs):
+    """
+    Run render_video on a worker thread and yield its ProgressEvents as they
+    arrive, for consumers that prefer iterating to a callback. Errors from the
+    render are re-raised once the events run out; closing the iterator early
+    cancels the render.
+    
+    Returns:
+        Iterator of ProgressEvent; the last one has stage "done"
+    """
+    events = queue.Queue()
+    cancel = kwargs.pop("cancel", None) or threading.Event()
+    finished = object()
+    error = []
+    
+    def run():
+        try:
+            render_video(storyboard, output_path, cancel=cancel, progress=events.put, **kwargs)
+        except BaseException as e:
+            error.append(e)
+        finally:
+            events.put(finished)
+    
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    try:
+        while True:
+            event = events.get()
+            if event is finished:
+                break
+            yield event
+    finally:
+        if worker.is_alive():
+            cancel.set()
+        worker.join()
+    if error:
+        raise error[0]
+
+def merge_shards(storyboard, output_path="scene.mp4", shard_count=1, fps=30, audio_path=None, target_duration=None,
+                 backend=None, renditions=None):
+    """
+    Join the chunks written by render_video(..., shard=(i, shard_count)) for
+    every i into the final MP4(s) without re-encoding.
+    
+    Takes the same storyboard and settings as the shards, checks every shard
+    finished the same render, then concatenates like an unsharded render.
+    
+    Returns:
+        Dict of rendition name -> path when renditions is given
+    
+    Raises:
+        RuntimeError: If a shard is missing, unfinished or from a different render
+        FileNotFoundError, ValueError: If audio_path is missing or has no audio (see check_audio)
+    """
+    backend = backend or os.getenv("RENDER_BACKEND", "pil")
+    outputs = _resolve_outputs(output_path, renditions)
     if audio_path:
-        vo = AudioFileClip(audio_path).subclip(0, total_duration)
-        clip = clip.set_audio(vo)
-
-    clip.write_videofile(
-        output_path, 
-        codec="libx264", 
-        audio_codec="aac" if audio_path else None, 
-        fps=fps, 
-        bitrate="6M",
-        verbose=False,
-        logger=None
-    )
-    
-    print(f"Video saved to {output_path}")
+        check_audio(audio_path)
+    storyboard = Storyboard.coerce(storyboard, target_duration)
+    total_duration, _, _, chunk_count, render_hash = _chunk_plan(storyboard, fps, backend, renditions)
+    
+    directory = parts_dir(output_path)
+    pending = []
+    for index in range(shard_count):
+        path = directory / _shard_manifest_name(index, shard_count)
+        try:
+            manifest = json.loads(path.read_text())
+        except (OSError, ValueError):
+            manifest = {}
+        if manifest.get("hash") != render_hash or not manifest.get("done"):
+            pending.append(index)
+    if pending:
+        raise RuntimeError(f"Shards {pending} of {shard_count} are missing, unfinished or from a different render")
+    
+    for name, path in outputs.items():
+        concat_chunks([directory / _chunk_name(i, name) for i in range(chunk_count)],
+                      path, audio_path, total_duration)
+    shutil.rmtree(directory)
+    
+    for path in outputs.values():
+        logger.info("Video saved to %s", path)
+    
+    if renditions:
+        return outputs